@@ -1,7 +1,9 @@
 """
 Tkinter visualizer for the snake AI in solver.py.
-Defines the expected API (move/measure/get_pos_* etc.) and then imports solver,
-so solver.py can run unchanged while the board is rendered.
+Runs a solver's Solver class against a game.Game, rendering the board while it
+plays. Modules without a Solver class still work the old way: the API
+(move/measure/get_pos_* etc.) is installed into builtins and the module is
+imported to drive the game.
 """
 import builtins
 import importlib
@@ -10,14 +12,18 @@ import sys
 import threading
 import tkinter as tk
 import time
+from collections import deque
+from tkinter import simpledialog
 from queue import Queue, Empty
 
-# Direction constants expected by solver.py
-North, East, South, West = 0, 1, 2, 3
+from game import DIR_VECS, Game, North, East, South, West
 
 BOARD_SIZE = 32
+MAX_CANVAS_PX = 1024
 CELL_PX = 32
 CANVAS_SIZE = BOARD_SIZE * CELL_PX
+# Cells smaller than this are drawn without grid lines, tree edges, cycle arrows or body connectors
+DETAIL_MIN_PX = 8
 BG_COLOR = "#0b1021"
 SNAKE_COLOR = "#22c55e"
 HEAD_COLOR = "#16a34a"
@@ -26,16 +32,12 @@ GRID_COLOR = "#1e293b"
 
 # Game state (guarded by state_lock)
 state_lock = threading.RLock()
-snake = [(0, 0)]  # list of (x, y) from tail to head
-snake_set = {(0, 0)}
-apple = None
-apple_eaten = True
-step_counter = 0
-game_over = False
-error_message = None
-hc_dirs = {}  # {(x,y): dir}
-tree_edges = {}  # {(bx,by): [status*4]}
-grow_pending = 0
+game = None  # game.Game being played
+solver = None  # Solver instance driving `game`, if the module provides one
+resume_data = None  # checkpoint.load() result to resume the next run_solver() from
+checkpointer = None  # checkpoint.Checkpointer handed to the next solver, if enabled
+replan_name = None  # solver.REPLAN_POLICIES key for solvers that take a re-plan policy (--replan)
+legacy_overlay = None  # _DictOverlay copied from a legacy solver module
 headless_mode = False
 
 # Render queue so the solver thread can push frames safely
@@ -46,167 +48,295 @@ step_gate = threading.Event()
 step_wait_millis = 5
 SOLVER_MODULE_NAME = None
 
-# ========= Snake/solver API =========
+# Watch mode: while watch_running is set the solver runs ungated, paced to
+# watch_rate steps per second, and publishes at most one frame per FRAME_INTERVAL
+watch_running = threading.Event()
+watch_rate = 50000
+FRAME_INTERVAL = 1 / 60
+next_frame_at = 0.0
+pace_origin = (0.0, 0)  # (perf_counter, step_counter) the pacing is measured from
+run_until_step = None  # pause once game.step_counter reaches this
+run_until_length = None  # pause once game.length exceeds this (next apple eaten)
+
+
+class VisualGame(Game):
+    """Game shared with the UI thread: moves are locked, rendered and gated by the Right key."""
+
+    def get_pos_x(self):
+        with state_lock:
+            return super().get_pos_x()
+
+    def get_pos_y(self):
+        with state_lock:
+            return super().get_pos_y()
+
+    def measure(self):
+        with state_lock:
+            return super().measure()
+
+    def move(self, direction):
+        with state_lock:
+            try:
+                super().move(direction)
+            finally:
+                if self.game_over or _frame_due():
+                    _capture_solver_state()
+                    _queue_state()
+        _wait_for_step()
+
+    def move_many(self, directions):
+        if step_wait_enabled and not watch_running.is_set():
+            # Single-stepping: every move is its own gated frame
+            applied = 0
+            for direction in directions:
+                step, length = self.step_counter, self.length
+                VisualGame.move(self, direction)
+                if self.step_counter == step:
+                    break
+                applied += 1
+                if self.length > length:
+                    break
+            return applied
+        if run_until_step is not None:
+            directions = directions[: max(1, run_until_step - self.step_counter)]
+        with state_lock:
+            try:
+                applied = super().move_many(directions)
+            finally:
+                if self.game_over or _frame_due():
+                    _capture_solver_state()
+                    _queue_state()
+        _wait_for_step()
+        return applied
+
+
+# ========= Snake/solver API (for modules without a Solver class) =========
 
 def get_world_size():
-    return BOARD_SIZE
+    return game.get_world_size()
 
 
 def get_pos_x():
-    with state_lock:
-        return snake[-1][0]
+    return game.get_pos_x()
 
 
 def get_pos_y():
-    with state_lock:
-        return snake[-1][1]
-
-
-def _spawn_apple_locked():
-    global apple, apple_eaten
-    free = []
-    for y in range(BOARD_SIZE):
-        for x in range(BOARD_SIZE):
-            if (x, y) not in snake_set:
-                free.append((x, y))
-    if not free:
-        apple = None
-        apple_eaten = False
-        return None
-    apple = random.choice(free)
-    apple_eaten = False
-    return apple
+    return game.get_pos_y()
 
 
 def measure():
     """Return the current apple position, creating one if needed."""
-    with state_lock:
-        if apple is None or apple_eaten:
-            _spawn_apple_locked()
-        return apple
-
-
-DIR_VECS = {
-    # y+ is north (up), as expected by solver.py
-    North: (0, 1),
-    East: (1, 0),
-    South: (0, -1),
-    West: (-1, 0),
-}
+    return game.measure()
 
 
 def move(direction):
     """Advance the snake by one cell in the given direction."""
-    global apple_eaten, game_over, step_counter, error_message, hc_dirs, tree_edges, grow_pending, step_wait_millis
-    if direction not in DIR_VECS:
-        error_message = f"Invalid direction: {direction}"
-        return
+    game.move(direction)
 
-    with state_lock:
-        if game_over:
-            return
 
-        dx, dy = DIR_VECS[direction]
-        hx, hy = snake[-1]
-        nx = hx + dx
-        ny = hy + dy
-
-        # Bounds check
-        if nx < 0 or ny < 0 or nx >= BOARD_SIZE or ny >= BOARD_SIZE:
-            game_over = True
-            error_message = f"Hit the wall at {(nx, ny)}"
-            raise RuntimeError(error_message)
-
-        # Self-collision check (moving into the tail is allowed if it vacates)
-        # Tail only vacates if we will pop it this step
-        will_pop_tail = grow_pending == 0 and not (apple is not None and (nx, ny) == apple)
-        tail_vacating = snake[0] if will_pop_tail else None
-        if (nx, ny) in snake_set and (tail_vacating is None or (nx, ny) != tail_vacating):
-            game_over = True
-            error_message = f"Ran into itself at {(nx, ny)}"
-            _queue_state()
-            raise RuntimeError(error_message)
-
-        ate = apple is not None and (nx, ny) == apple
-        snake.append((nx, ny))
-        snake_set.add((nx, ny))
-        # Apply previously scheduled growth: if pending, skip pop this turn
-        if grow_pending > 0:
-            grow_pending -= 1
-        else:
-            tail = snake.pop(0)
-            snake_set.discard(tail)
-        # Eating schedules growth for the *next* move
-        if ate:
-            apple_eaten = True
-            grow_pending += 1
-
-        step_counter += 1
-
-        # Capture latest Hamiltonian data if solver exposed it
-        solver_mod = sys.modules.get(SOLVER_MODULE_NAME)
-        if solver_mod is not None:
-            hc_map = getattr(solver_mod, "hamilton_cycle", None)
-            if hc_map:
-                hc_dirs = dict(hc_map)
-            tree_state = getattr(solver_mod, "tree", None)
-            if tree_state:
-                # Deep copy lists to avoid mutation across threads
-                tree_edges = {k: list(v) for k, v in tree_state.items()}
-        _queue_state()
-    _wait_for_step()
+def move_many(directions):
+    """Apply moves until one eats the apple; returns how many were applied."""
+    return game.move_many(directions)
 
 
 def wait_for_step():
-    global apple_eaten, game_over, step_counter, error_message, hc_dirs, tree_edges, grow_pending
-
     """Push a frame to the UI and block until the next Right-key step."""
-    # Capture latest Hamiltonian data if solver exposed it
-    solver_mod = sys.modules.get(SOLVER_MODULE_NAME)
-    if solver_mod is not None:
-        hc_map = getattr(solver_mod, "hamilton_cycle", None)
-        if hc_map:
-            hc_dirs = dict(hc_map)
-        tree_state = getattr(solver_mod, "tree", None)
-        if tree_state:
-            # Deep copy lists to avoid mutation across threads
-            tree_edges = {k: list(v) for k, v in tree_state.items()}
+    _capture_solver_state()
     _queue_state()
     _wait_for_step()
 
 
 def _wait_for_step():
-    """Wait for a Right-key trigger; supports key repeat from UI."""
+    """Wait for a Right-key trigger (supports key repeat), or pace the step rate in watch mode."""
     if not step_wait_enabled:
         return
+    if watch_running.is_set():
+        if not _run_target_reached():
+            _pace()
+            return
+        pause_watch()
+        with state_lock:
+            _capture_solver_state()
+            _queue_state()
     step_gate.wait()
     step_gate.clear()
 
 
+def _frame_due():
+    """Decimate frames while free-running: at most one per FRAME_INTERVAL."""
+    global next_frame_at
+    if not watch_running.is_set():
+        return True
+    now = time.perf_counter()
+    if now < next_frame_at:
+        return False
+    next_frame_at = now + FRAME_INTERVAL
+    return True
+
+
+def _pace():
+    """Sleep off any lead over watch_rate; a backlog from slow re-plans is forgiven, not caught up."""
+    global pace_origin
+    origin_ts, origin_step = pace_origin
+    now = time.perf_counter()
+    lead = (game.step_counter - origin_step) / watch_rate - (now - origin_ts)
+    if lead > 0.002:
+        time.sleep(lead)
+    elif lead < -0.1:
+        pace_origin = (now, game.step_counter)
+
+
+def _run_target_reached():
+    if run_until_step is not None and game.step_counter >= run_until_step:
+        return True
+    return run_until_length is not None and game.length > run_until_length
+
+
+def resume_watch(until_step=None, next_apple=False):
+    """Free-run the solver, optionally only until a step count or the next apple."""
+    global run_until_step, run_until_length, pace_origin
+    with state_lock:
+        run_until_step = until_step
+        run_until_length = game.length if next_apple else None
+        pace_origin = (time.perf_counter(), game.step_counter)
+    watch_running.set()
+    step_gate.set()
+
+
+def pause_watch():
+    """Return to single-stepping with the Right key."""
+    global run_until_step, run_until_length
+    watch_running.clear()
+    step_gate.clear()
+    run_until_step = None
+    run_until_length = None
+
+
+def set_watch_rate(rate):
+    global watch_rate, pace_origin
+    watch_rate = max(1, int(rate))
+    with state_lock:
+        pace_origin = (time.perf_counter(), game.step_counter)
+
+
 def _install_api_into_builtins():
-    """Expose expected API/directions to solver.py."""
+    """Expose the module-level API to legacy solver scripts."""
     builtins.measure = measure
     builtins.move = move
+    builtins.move_many = move_many
     builtins.wait_for_step = wait_for_step
 
-# Install immediately so importing solver.py directly also works
-_install_api_into_builtins()
+
+def set_board_size(size):
+    """Play on a size x size board, shrinking cells so the canvas stays within MAX_CANVAS_PX."""
+    global BOARD_SIZE, CELL_PX, CANVAS_SIZE
+    if size < 4 or size % 2:
+        raise ValueError(f"Board size must be even and at least 4, got {size}")
+    BOARD_SIZE = size
+    CELL_PX = max(2, min(32, MAX_CANVAS_PX // size))
+    CANVAS_SIZE = BOARD_SIZE * CELL_PX
+
+
+def new_game(seed=None):
+    """Start a fresh game on the shared board state."""
+    global game, solver
+    game_cls = Game if headless_mode else VisualGame
+    game = game_cls(BOARD_SIZE, seed=seed)
+    solver = None
+    return game
+
+
+def resume_game(data):
+    """Start a game from a loaded checkpoint; its solver state is applied by run_solver()."""
+    global resume_data
+    from checkpoint import restore_game
+
+    set_board_size(data["game"]["size"])
+    new_game(data["seed"])
+    restore_game(game, data["game"])
+    resume_data = data
+    return game
+
+
+def run_solver(module_name):
+    """Play the current game with the named solver module."""
+    global solver
+    # Legacy solver scripts play the whole game while being imported
+    _install_api_into_builtins()
+    module = importlib.import_module(module_name)
+    solver_cls = getattr(module, "Solver", None)
+    if solver_cls is not None:
+        if replan_name is not None:
+            policies = getattr(module, "REPLAN_POLICIES", None)
+            if policies is None:
+                raise ValueError(f"{module_name} has no re-plan policies")
+            solver = solver_cls(game, replan=policies[replan_name]())
+        else:
+            solver = solver_cls(game)
+        if not headless_mode and hasattr(solver, "publish_snapshots"):
+            solver.publish_snapshots = True
+        if resume_data is not None and resume_data["solver_state"] is not None:
+            solver.set_state(resume_data["solver_state"])
+        if checkpointer is not None and hasattr(solver, "get_state"):
+            solver.checkpointer = checkpointer
+        try:
+            solver.run()
+        except Exception:
+            saver = getattr(solver, "checkpointer", None)
+            if saver is not None:
+                if saver.crashed(solver):
+                    print(f"Checkpoint of the failing position written to {saver.path}")
+                elif saver.saved_step is not None:
+                    print(f"Last resumable checkpoint (step {saver.saved_step}) is in {saver.path}")
+            raise
 
 # ========= Rendering =========
 
+class _DictOverlay:
+    """Cycle/tree copied out of a legacy solver module's hamilton_cycle and tree dicts."""
+
+    def __init__(self, cycle, tree):
+        self.cycle = cycle
+        self.tree = tree
+
+    def cycle_dirs(self):
+        return self.cycle
+
+    def tree_dirs(self):
+        return self.tree
+
+
+def _capture_solver_state():
+    """Copy a legacy solver module's Hamiltonian cycle and tree for rendering."""
+    global legacy_overlay
+    if headless_mode or solver is not None:
+        # Solver instances publish immutable snapshots themselves when they re-plan
+        return
+    source = sys.modules.get(SOLVER_MODULE_NAME)
+    if source is None:
+        return
+    hc_map = getattr(source, "hamilton_cycle", None)
+    tree_state = getattr(source, "tree", None)
+    if hc_map or tree_state:
+        # Deep copy lists to avoid mutation across threads
+        legacy_overlay = _DictOverlay(
+            dict(hc_map) if hc_map else {},
+            {k: list(v) for k, v in tree_state.items()} if tree_state else {},
+        )
+
+
 def _queue_state():
-    if headless_mode:
+    if headless_mode or game is None:
         return
     snapshot = None
     with state_lock:
         snapshot = (
-            list(snake),
-            apple,
-            dict(hc_dirs),
-            {k: list(v) for k, v in tree_edges.items()},
-            step_counter,
-            game_over,
-            error_message,
+            list(game.snake),
+            game.apple,
+            getattr(solver, "snapshot", None) if solver is not None else legacy_overlay,
+            game.step_counter,
+            game.game_over,
+            game.error_message,
         )
     try:
         if render_queue.full():
@@ -216,6 +346,21 @@ def _queue_state():
         pass
 
 
+_overlay_cache = [None, {}, {}]  # overlay last expanded, its cycle dict, its tree dict
+
+
+def _expand_state(state):
+    """Turn a queued frame into draw_state's layout, expanding each overlay only once."""
+    snake_cells, apple_pos, overlay, steps, over, err = state
+    if overlay is None:
+        hc_map, tree_state = {}, {}
+    else:
+        if overlay is not _overlay_cache[0]:
+            _overlay_cache[:] = [overlay, overlay.cycle_dirs(), overlay.tree_dirs()]
+        hc_map, tree_state = _overlay_cache[1], _overlay_cache[2]
+    return snake_cells, apple_pos, hc_map, tree_state, steps, over, err
+
+
 def _draw_grid(canvas: tk.Canvas):
     for i in range(1, BOARD_SIZE):
         offset = i * CELL_PX
@@ -229,106 +374,211 @@ def _canvas_coords(x, y):
 
 
 
-def draw_state(canvas: tk.Canvas, state):
-    snake_cells, apple_pos, hc_map, tree_state, steps, over, err = state
-    canvas.delete("all")
-    canvas.configure(bg=BG_COLOR)
-    _draw_grid(canvas)
+TREE_COLORS = {0: "#334155", 1: "#b91c1c", 2: "#38bdf8"}  # FREE/forbidden/must (must = cyan)
+CYCLE_COLOR = "#60a5fa"
+
+
+class BoardRenderer:
+    """
+    Retained-mode board drawing.
+    Every canvas item is created once; each frame only shows, hides, moves or
+    recolors the items whose snake, apple, arrow or tree-edge state changed.
+    Cycle arrows and tree edges are tagged layers that can be toggled.
+    """
+
+    def __init__(self, canvas: tk.Canvas):
+        self.canvas = canvas
+        self.layers = {"tree": True, "cycle": True}
+        # Large boards get small cells: only the snake and the apple are drawn
+        self.detailed = CELL_PX >= DETAIL_MIN_PX
+        canvas.configure(bg=BG_COLOR)
+        half = CELL_PX * 0.5
+
+        # Spanning tree edges on the block grid: E and S of each block (S instead of N)
+        self.tree_items = {}  # (bx, by, d) -> item
+        self.tree_drawn = {}  # (bx, by, d) -> status currently shown
+        self.tree_source = None
+        # Hamiltonian cycle arrows, one per cell
+        self.arrow_items = {}
+        self.arrow_drawn = {}  # (x, y) -> dir currently shown
+        self.cycle_source = None
+        if self.detailed:
+            _draw_grid(canvas)
+            for bx in range(BOARD_SIZE // 2):
+                for by in range(BOARD_SIZE // 2):
+                    cx, cy = _canvas_coords(bx * 2 + 1, by * 2)
+                    for d in (East, South):
+                        dx, dy = DIR_VECS[d]
+                        nbx, nby = bx + dx, by + dy
+                        if 0 <= nbx < BOARD_SIZE // 2 and 0 <= nby < BOARD_SIZE // 2:
+                            nx, ny = _canvas_coords(nbx * 2 + 1, nby * 2)
+                            self.tree_items[(bx, by, d)] = canvas.create_line(
+                                cx, cy, nx, ny, fill=TREE_COLORS[0], width=3, state=tk.HIDDEN, tags=("tree",)
+                            )
+            for x in range(BOARD_SIZE):
+                for y in range(BOARD_SIZE):
+                    x0, y0 = _canvas_coords(x, y)
+                    sx, sy = x0 + half, y0 + half
+                    self.arrow_items[(x, y)] = canvas.create_line(
+                        sx, sy, sx, sy, fill=CYCLE_COLOR, width=2, arrow=tk.LAST, arrowshape=(6, 8, 3),
+                        state=tk.HIDDEN, tags=("cycle",),
+                    )
+
+        self.apple_item = canvas.create_rectangle(0, 0, 0, 0, fill=APPLE_COLOR, outline="", state=tk.HIDDEN)
+        self.apple_drawn = None
+
+        # Thick connectors between orthogonal neighbors so the body looks continuous
+        self.link_items = {}  # ((x, y), (x', y')) with the E/N neighbor second -> item
+        if self.detailed:
+            for x in range(BOARD_SIZE):
+                for y in range(BOARD_SIZE):
+                    x0, y0 = _canvas_coords(x, y)
+                    for nx, ny in ((x + 1, y), (x, y + 1)):
+                        if nx < BOARD_SIZE and ny < BOARD_SIZE:
+                            nx0, ny0 = _canvas_coords(nx, ny)
+                            self.link_items[((x, y), (nx, ny))] = canvas.create_line(
+                                x0 + half, y0 + half, nx0 + half, ny0 + half, fill=SNAKE_COLOR, width=CELL_PX // 4,
+                                capstyle=tk.ROUND, joinstyle=tk.ROUND, state=tk.HIDDEN,
+                            )
+        self.links_drawn = set()
+        self.cell_items = {}
+        inset = CELL_PX // 8
+        for x in range(BOARD_SIZE):
+            for y in range(BOARD_SIZE):
+                x0, y0 = _canvas_coords(x, y)
+                self.cell_items[(x, y)] = canvas.create_rectangle(
+                    x0 + inset, y0 + inset, x0 + CELL_PX - inset, y0 + CELL_PX - inset,
+                    fill=SNAKE_COLOR, outline="", state=tk.HIDDEN,
+                )
+        self.cells_drawn = set()
+        self.head_drawn = None
+
+        self.message_item = canvas.create_text(
+            CANVAS_SIZE // 2, CANVAS_SIZE // 2, text="", fill="white", font=("Helvetica", 20, "bold"), state=tk.HIDDEN
+        )
+        self.message_drawn = None
+
+    def toggle_layer(self, name):
+        """Show or hide a whole overlay layer ("tree" or "cycle") without touching its items."""
+        self.layers[name] = not self.layers[name]
+        self._sync_layer(name)
+
+    def _sync_layer(self, name):
+        has_data = bool(self.tree_drawn if name == "tree" else self.arrow_drawn)
+        state = tk.NORMAL if self.layers[name] and has_data else tk.HIDDEN
+        self.canvas.itemconfigure(name, state=state)
 
-    # Draw spanning tree edges on block grid
-    if tree_state:
-        color_map = {0: "#334155", 1: "#b91c1c", 2: "#38bdf8"}  # FREE/forbidden/must (must = cyan)
-        for (bx, by), dirs in tree_state.items():
-            cx, cy = _canvas_coords(bx * 2 + 1, by * 2)
-            for d, status in enumerate(dirs):
-                if status is None:
+    def _update_tree(self, tree_state):
+        if tree_state is self.tree_source or not self.detailed:
+            return
+        self.tree_source = tree_state
+        canvas = self.canvas
+        for (bx, by), dirs in (tree_state or {}).items():
+            for d in (East, South):
+                item = self.tree_items.get((bx, by, d))
+                status = dirs[d]
+                if item is None or status is None or self.tree_drawn.get((bx, by, d)) == status:
                     continue
-                if d in (1, 2):  # draw E and S to avoid duplicates (S instead of N)
-                    dx, dy = DIR_VECS[East] if d == 1 else DIR_VECS[South]
-                    nbx, nby = bx + dx, by + dy
-                    if 0 <= nbx < BOARD_SIZE // 2 and 0 <= nby < BOARD_SIZE // 2:
-                        nx, ny = _canvas_coords(nbx * 2 + 1, nby * 2)
-                        width = 1 if status == 1 else 3
-                        canvas.create_line(cx, cy, nx, ny, fill=color_map.get(status, "#475569"), width=width)
-
-    # Draw Hamiltonian cycle directions
-    if hc_map:
-        for (x, y), d in hc_map.items():
+                canvas.itemconfigure(item, fill=TREE_COLORS.get(status, "#475569"), width=1 if status == 1 else 3)
+                self.tree_drawn[(bx, by, d)] = status
+        if not tree_state:
+            self.tree_drawn.clear()
+        self._sync_layer("tree")
+
+    def _update_cycle(self, hc_map):
+        if hc_map is self.cycle_source or not self.detailed:
+            return
+        self.cycle_source = hc_map
+        canvas = self.canvas
+        half = CELL_PX * 0.5
+        for (x, y), d in (hc_map or {}).items():
+            if self.arrow_drawn.get((x, y)) == d:
+                continue
             dx, dy = DIR_VECS.get(d, (0, 0))
             x0, y0 = _canvas_coords(x, y)
-            sx, sy = x0 + CELL_PX * 0.5, y0 + CELL_PX * 0.5
-            ex, ey = sx + dx * CELL_PX * 0.6, sy - dy * CELL_PX * 0.6
-            canvas.create_line(sx, sy, ex, ey, fill="#60a5fa", width=2, arrow=tk.LAST, arrowshape=(6, 8, 3))
-
-    if apple_pos is not None:
-        ax, ay = apple_pos
-        x0, y0 = _canvas_coords(ax, ay)
-        canvas.create_rectangle(
-            x0 + 2,
-            y0 + 2,
-            x0 + CELL_PX - 2,
-            y0 + CELL_PX - 2,
-            fill=APPLE_COLOR,
-            outline="",
-        )
+            sx, sy = x0 + half, y0 + half
+            canvas.coords(self.arrow_items[(x, y)], sx, sy, sx + dx * CELL_PX * 0.6, sy - dy * CELL_PX * 0.6)
+            self.arrow_drawn[(x, y)] = d
+        if not hc_map:
+            self.arrow_drawn.clear()
+        self._sync_layer("cycle")
+
+    def _update_apple(self, apple_pos):
+        if apple_pos == self.apple_drawn:
+            return
+        self.apple_drawn = apple_pos
+        if apple_pos is None:
+            self.canvas.itemconfigure(self.apple_item, state=tk.HIDDEN)
+            return
+        x0, y0 = _canvas_coords(*apple_pos)
+        inset = CELL_PX // 16
+        self.canvas.coords(self.apple_item, x0 + inset, y0 + inset, x0 + CELL_PX - inset, y0 + CELL_PX - inset)
+        self.canvas.itemconfigure(self.apple_item, state=tk.NORMAL)
+
+    def _update_snake(self, snake_cells):
+        canvas = self.canvas
+        cells = set(snake_cells)
+        links = set()
+        if self.detailed:
+            for a, b in zip(snake_cells, snake_cells[1:]):
+                links.add((a, b) if a <= b else (b, a))
+        for cell in self.cells_drawn - cells:
+            canvas.itemconfigure(self.cell_items[cell], state=tk.HIDDEN)
+        for cell in cells - self.cells_drawn:
+            canvas.itemconfigure(self.cell_items[cell], state=tk.NORMAL)
+        for link in self.links_drawn - links:
+            canvas.itemconfigure(self.link_items[link], state=tk.HIDDEN)
+        for link in links - self.links_drawn:
+            canvas.itemconfigure(self.link_items[link], state=tk.NORMAL)
+        head = snake_cells[-1] if snake_cells else None
+        if head != self.head_drawn:
+            if self.head_drawn is not None:
+                canvas.itemconfigure(self.cell_items[self.head_drawn], fill=SNAKE_COLOR)
+            if head is not None:
+                canvas.itemconfigure(self.cell_items[head], fill=HEAD_COLOR)
+            self.head_drawn = head
+        self.cells_drawn = cells
+        self.links_drawn = links
+
+    def _update_message(self, over, err):
+        message = ("Game over" if err is None else err) if over else None
+        if message == self.message_drawn:
+            return
+        self.message_drawn = message
+        if message is None:
+            self.canvas.itemconfigure(self.message_item, state=tk.HIDDEN)
+        else:
+            self.canvas.itemconfigure(self.message_item, text=message, state=tk.NORMAL)
 
-    for i, (sx, sy) in enumerate(snake_cells):
-        x0, y0 = _canvas_coords(sx, sy)
-        fill = HEAD_COLOR if i == len(snake_cells) - 1 else SNAKE_COLOR
-        if i > 0:
-            px, py = snake_cells[i - 1]
-            px0, py0 = _canvas_coords(px, py)
-            cx, cy = x0 + CELL_PX * 0.5, y0 + CELL_PX * 0.5
-            pcx, pcy = px0 + CELL_PX * 0.5, py0 + CELL_PX * 0.5
-            # Draw a thick connector so body looks continuous
-            canvas.create_line(
-                pcx,
-                pcy,
-                cx,
-                cy,
-                fill=SNAKE_COLOR,
-                width=8,
-                capstyle=tk.ROUND,
-                joinstyle=tk.ROUND,
-            )
-        canvas.create_rectangle(
-            x0 + 4,
-            y0 + 4,
-            x0 + CELL_PX - 4,
-            y0 + CELL_PX - 4,
-            fill=fill,
-            outline="",
-        )
+    def update(self, state):
+        snake_cells, apple_pos, hc_map, tree_state, steps, over, err = state
+        self._update_tree(tree_state)
+        self._update_cycle(hc_map)
+        self._update_apple(apple_pos)
+        self._update_snake(snake_cells)
+        self._update_message(over, err)
 
-    if over:
-        canvas.create_text(
-            CANVAS_SIZE // 2,
-            CANVAS_SIZE // 2,
-            text="Game over" if err is None else err,
-            fill="white",
-            font=("Helvetica", 20, "bold"),
-        )
+
+def draw_state(renderer: BoardRenderer, state):
+    """Bring the canvas up to date with one frame."""
+    renderer.update(state)
 
 
 # ========= Runner / UI =========
 
 def _solver_runner():
-    global error_message, hc_dirs, tree_edges
-    _install_api_into_builtins()
     _queue_state()
     _wait_for_step()
-    importlib.import_module(SOLVER_MODULE_NAME)  # running the module drives the game
-    with state_lock:
-        hc_map = getattr(sys.modules.get(SOLVER_MODULE_NAME), "hamilton_cycle", None)
-        if hc_map:
-            hc_dirs = dict(hc_map)
-        tree_state = getattr(sys.modules.get(SOLVER_MODULE_NAME), "tree", None)
-        if tree_state:
-            tree_edges = {k: list(v) for k, v in tree_state.items()}
-        _queue_state()
+    try:
+        run_solver(SOLVER_MODULE_NAME)
+    finally:
+        with state_lock:
+            _capture_solver_state()
+            _queue_state()
 
 
-def launch_ui():
+def launch_ui(runner=None):
+    """Show the board while `runner` (default: the solver) plays on a background thread."""
     if stop_event.is_set():
         stop_event.clear()
     _queue_state()  # initial frame
@@ -337,6 +587,7 @@ def launch_ui():
     root.title("Snake solver visualizer")
     canvas = tk.Canvas(root, width=CANVAS_SIZE, height=CANVAS_SIZE, highlightthickness=0)
     canvas.pack(padx=10, pady=10)
+    renderer = BoardRenderer(canvas)
 
     status_var = tk.StringVar()
     status = tk.Label(root, textvariable=status_var, anchor="w")
@@ -406,8 +657,31 @@ def launch_ui():
     root.bind("<KeyRelease-Right>", on_right_release)
     root.bind("<KeyPress-Up>", lambda e: adjust_step_wait(-1))
     root.bind("<KeyPress-Down>", lambda e: adjust_step_wait(1))
+    root.bind("<KeyPress-c>", lambda e: renderer.toggle_layer("cycle"))
+    root.bind("<KeyPress-t>", lambda e: renderer.toggle_layer("tree"))
+
+    def toggle_watch(event=None):
+        if watch_running.is_set():
+            pause_watch()
+            _queue_state()
+        else:
+            resume_watch()
+
+    def run_until_step_prompt(event=None):
+        target = simpledialog.askinteger("Run until step", "Pause at step:", parent=root, minvalue=0)
+        if target is not None:
+            resume_watch(until_step=target)
+
+    root.bind("<KeyPress-space>", toggle_watch)
+    root.bind("<KeyPress-n>", lambda e: resume_watch(next_apple=True))
+    root.bind("<KeyPress-g>", run_until_step_prompt)
+    root.bind("<KeyPress-plus>", lambda e: set_watch_rate(watch_rate * 2))
+    root.bind("<KeyPress-equal>", lambda e: set_watch_rate(watch_rate * 2))
+    root.bind("<KeyPress-minus>", lambda e: set_watch_rate(watch_rate // 2))
     root.focus_set()
 
+    rate_samples = deque()  # (monotonic time, step) of recent frames for the measured rate
+
     def pump():
         if stop_event.is_set():
             return
@@ -418,13 +692,23 @@ def launch_ui():
         except Empty:
             pass
         if latest is not None:
-            draw_state(canvas, latest)
+            latest = _expand_state(latest)
+            draw_state(renderer, latest)
             snake_cells, apple_pos, hc_map, tree_state, steps, over, err = latest
+            now = time.monotonic()
+            rate_samples.append((now, steps))
+            while len(rate_samples) > 2 and now - rate_samples[0][0] > 1.0:
+                rate_samples.popleft()
+            (t0, s0), (t1, s1) = rate_samples[0], rate_samples[-1]
+            measured = (s1 - s0) / (t1 - t0) if t1 > t0 else 0.0
             length = len(snake_cells)
             msg = f"Length: {length} | Steps: {steps}"
             if over:
                 msg += " | Finished" if err is None else f" | {err}"
-            msg += f" | Delay: {step_wait_millis} ms"
+            if watch_running.is_set():
+                msg += f" | Rate: {measured:,.0f}/s (target {watch_rate:,}/s)"
+            else:
+                msg += f" | Paused | Delay: {step_wait_millis} ms"
             status_var.set(msg)
         if not stop_event.is_set():
             try:
@@ -443,14 +727,97 @@ def launch_ui():
 
     root.protocol("WM_DELETE_WINDOW", on_close)
 
-    threading.Thread(target=_solver_runner, daemon=True).start()
+    threading.Thread(target=runner or _solver_runner, daemon=True).start()
+    root.mainloop()
+
+
+def launch_replay(path):
+    """Scrub through a recorded game (see replay.py) with a slider and keys."""
+    from replay import ReplayReader
+
+    reader = ReplayReader(path)
+    set_board_size(reader.size)
+    root = tk.Tk()
+    root.title(f"Snake replay: {path}")
+    canvas = tk.Canvas(root, width=CANVAS_SIZE, height=CANVAS_SIZE, highlightthickness=0)
+    canvas.pack(padx=10, pady=10)
+    renderer = BoardRenderer(canvas)
+    position = tk.IntVar(value=reader.start_step)
+    playback = {"job": None, "speed": 64}  # steps per 30 ms tick while playing
+
+    def show(step):
+        g = reader.seek(step)
+        over = reader.game_over and g.step_counter == reader.final_step
+        err = reader.error_message if over else None
+        draw_state(renderer, (list(g.snake), g.apple, {}, {}, g.step_counter, over, err))
+        status_var.set(
+            f"Length: {g.length} | Steps: {g.step_counter} / {reader.final_step} | Seed: {reader.seed}"
+            + (f" | Playing x{playback['speed']}" if playback["job"] is not None else "")
+        )
+
+    def jump_to(step):
+        step = max(reader.start_step, min(step, reader.final_step))
+        position.set(step)
+        show(step)
+
+    scale = tk.Scale(
+        root, from_=reader.start_step, to=reader.final_step, orient=tk.HORIZONTAL, showvalue=False,
+        variable=position, command=lambda v: show(int(float(v))),
+    )
+    scale.pack(fill="x", padx=10)
+    status_var = tk.StringVar()
+    tk.Label(root, textvariable=status_var, anchor="w").pack(fill="x")
+
+    def tick():
+        jump_to(position.get() + playback["speed"])
+        if position.get() >= reader.final_step:
+            playback["job"] = None
+            show(position.get())
+            return
+        playback["job"] = root.after(30, tick)
+
+    def toggle_play(event=None):
+        if playback["job"] is not None:
+            root.after_cancel(playback["job"])
+            playback["job"] = None
+            show(position.get())
+        else:
+            playback["job"] = root.after(30, tick)
+
+    def set_speed(speed):
+        playback["speed"] = max(1, speed)
+        show(position.get())
+
+    root.bind("<KeyPress-Right>", lambda e: jump_to(position.get() + 1))
+    root.bind("<KeyPress-Left>", lambda e: jump_to(position.get() - 1))
+    root.bind("<KeyPress-Next>", lambda e: jump_to(position.get() + reader.keyframe_interval))
+    root.bind("<KeyPress-Prior>", lambda e: jump_to(position.get() - reader.keyframe_interval))
+    root.bind("<KeyPress-Home>", lambda e: jump_to(reader.start_step))
+    root.bind("<KeyPress-End>", lambda e: jump_to(reader.final_step))
+    root.bind("<KeyPress-space>", toggle_play)
+    root.bind("<KeyPress-plus>", lambda e: set_speed(playback["speed"] * 2))
+    root.bind("<KeyPress-equal>", lambda e: set_speed(playback["speed"] * 2))
+    root.bind("<KeyPress-minus>", lambda e: set_speed(playback["speed"] // 2))
+    root.bind("<KeyPress-c>", lambda e: renderer.toggle_layer("cycle"))
+    root.bind("<KeyPress-t>", lambda e: renderer.toggle_layer("tree"))
+    root.focus_set()
+    jump_to(reader.start_step)
     root.mainloop()
 
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage: python app.py <solver> [--fast] [--seed <value>]")
+        print(
+            "Usage: python app.py <solver> [--fast] [--watch [<steps/s>]] [--seed <value>] [--size <n>]"
+            " [--profile [<path>]] [--record [<path>]]\n"
+            "       [--replan fixed|adaptive|budget] [--checkpoint [<path>]] [--checkpoint-every <steps>]"
+            " [--resume <path>]\n"
+            "       python app.py --replay <path>"
+        )
         sys.exit(1)
+    if sys.argv[1] == "--replay":
+        launch_replay(sys.argv[2])
+        sys.exit(0)
     solver_arg = sys.argv[1]
     SOLVER_MODULE_NAME = solver_arg
     args = sys.argv[2:]
@@ -463,19 +830,108 @@ if __name__ == "__main__":
             seed_val = int(args[idx + 1])
         except Exception:
             seed_val = None
+    # A checkpoint brings its own seed and board size
+    resume = None
+    if "--resume" in args:
+        from checkpoint import load
+
+        idx = args.index("--resume")
+        resume = load(args[idx + 1])
+        if resume["solver"] is not None and resume["solver"] != solver_arg:
+            print(f"{args[idx + 1]} was written by {resume['solver']}; resume it with python app.py {resume['solver']}")
+            sys.exit(1)
+        seed_val = resume["seed"]
+        print(f"Resuming {args[idx + 1]} at step {resume['game']['step_counter']}")
+        if "--size" in args and int(args[args.index("--size") + 1]) != resume["game"]["size"]:
+            print(f"Ignoring --size: the checkpoint is for a {resume['game']['size']}x{resume['game']['size']} board")
     if seed_val is None:
         seed_val = random.randrange(0, 1 << 16)
-    random.seed(seed_val)
     print(f"Using random seed: {seed_val}")
 
+    if "--replan" in args:
+        from solver import REPLAN_POLICIES
+
+        replan_name = args[args.index("--replan") + 1]
+        if replan_name not in REPLAN_POLICIES:
+            print(f"Unknown re-plan policy {replan_name!r}; choose from {', '.join(REPLAN_POLICIES)}")
+            sys.exit(1)
+
+    if "--size" in args and resume is None:
+        idx = args.index("--size")
+        set_board_size(int(args[idx + 1]))
+
+    # Periodic checkpoints, plus one of the failing position if the solver crashes
+    if "--checkpoint" in args:
+        from checkpoint import CHECKPOINT_EVERY, Checkpointer
+
+        idx = args.index("--checkpoint")
+        checkpoint_path = f"checkpoint_{seed_val}.json"
+        if idx + 1 < len(args) and not args[idx + 1].startswith("--"):
+            checkpoint_path = args[idx + 1]
+        every = CHECKPOINT_EVERY
+        if "--checkpoint-every" in args:
+            every = int(args[args.index("--checkpoint-every") + 1])
+        checkpointer = Checkpointer(checkpoint_path, seed_val, solver_arg, every)
+
+    # Optional instrumentation; nothing is wrapped unless --profile is given
+    profiler = None
+    if "--profile" in args:
+        from profiling import Profiler
+
+        idx = args.index("--profile")
+        profile_path = "profile.json"
+        if idx + 1 < len(args) and not args[idx + 1].startswith("--"):
+            profile_path = args[idx + 1]
+        profiler = Profiler()
+        profiler.enable(render_module=sys.modules[__name__])
+
+    # Optional replay recording of the whole game, started once the board exists
+    record_path = None
+    recorder = None
+    crash = None
+    if "--record" in args:
+        idx = args.index("--record")
+        record_path = f"replay_{seed_val}.snkr"
+        if idx + 1 < len(args) and not args[idx + 1].startswith("--"):
+            record_path = args[idx + 1]
+
     if "--fast" in args:
         headless_mode = True
         step_wait_enabled = False
+    if resume is not None:
+        resume_game(resume)
+    else:
+        new_game(seed_val)
+    if record_path is not None:
+        from replay import ReplayWriter
+
         try:
-            _install_api_into_builtins()
-            importlib.import_module(SOLVER_MODULE_NAME)
-            print(f"Finished. Steps: {step_counter}")
+            recorder = ReplayWriter(record_path, game.size, seed_val)
+        except ValueError as exc:
+            print(f"Cannot record: {exc}")
+            sys.exit(1)
+        recorder.attach(game)
+
+    if "--fast" in args:
+        try:
+            run_solver(SOLVER_MODULE_NAME)
+            print(f"Finished. Steps: {game.step_counter}")
         except Exception as exc:
+            crash = str(exc)
             print(f"Solver crashed: {exc}")
     else:
+        if "--watch" in args:
+            idx = args.index("--watch")
+            if idx + 1 < len(args) and not args[idx + 1].startswith("--"):
+                set_watch_rate(int(args[idx + 1]))
+            resume_watch()
         launch_ui()
+
+    if recorder is not None:
+        recorder.close(game, crash)
+        print(f"Replay written to {record_path}")
+
+    if profiler is not None:
+        profiler.print_summary()
+        profiler.dump(profile_path)
+        print(f"Profile written to {profile_path}")
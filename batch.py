@@ -0,0 +1,174 @@
+"""
+Parallel multi-seed benchmark runner.
+Plays one headless game per seed on a process pool and appends every result to a
+JSON Lines file, so an interrupted sweep picks up where it stopped.
+
+    python batch.py solver --seeds 0-99 --workers 8
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+
+from solver import REPLAN_POLICIES
+
+
+def parse_seeds(spec):
+    """Parse "0-99,120,200-209" into an ordered list of unique seeds."""
+    seeds = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            lo, hi = part.split("-", 1)
+            seeds.extend(range(int(lo), int(hi) + 1))
+        else:
+            seeds.append(int(part))
+    return list(dict.fromkeys(seeds))
+
+
+def play_one(job):
+    """Run a single headless game in a worker process."""
+    solver_name, seed, size, replan = job
+    import app
+
+    app.headless_mode = True
+    app.replan_name = replan
+    app.step_wait_enabled = False
+    app.set_board_size(size)
+    game = app.new_game(seed)
+    error = None
+    start = time.perf_counter()
+    try:
+        app.run_solver(solver_name)
+    except Exception as exc:
+        error = f"{type(exc).__name__}: {exc}"
+    finally:
+        if app.solver is None:
+            # Legacy solver scripts play on import; forget them so the next seed re-runs
+            sys.modules.pop(solver_name, None)
+    wall = time.perf_counter() - start
+    cycle_cache = getattr(app.solver, "cycle_cache", None)
+    return {
+        "solver": solver_name,
+        "seed": seed,
+        "size": size,
+        "replan": replan,
+        "success": error is None and not game.game_over,
+        "moves": game.step_counter,
+        "length": game.length,
+        "apples": game.length - 1,
+        "wall_time": wall,
+        "error": error or game.error_message,
+        "cycle_cache": cycle_cache.stats() if cycle_cache is not None else None,
+    }
+
+
+def load_results(path):
+    results = []
+    if not os.path.exists(path):
+        return results
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                results.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A sweep killed mid-write leaves a truncated last line
+                continue
+    return results
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of an unsorted list."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize(results):
+    moves = [r["moves"] for r in results if r["success"]]
+    walls = [r["wall_time"] for r in results]
+    apples = sum(r["apples"] for r in results)
+    return {
+        "games": len(results),
+        "success_rate": sum(r["success"] for r in results) / len(results) if results else None,
+        "moves_mean": statistics.fmean(moves) if moves else None,
+        "moves_p50": percentile(moves, 50),
+        "moves_p99": percentile(moves, 99),
+        "wall_per_game": statistics.fmean(walls) if walls else None,
+        "wall_per_apple": sum(walls) / apples if apples else None,
+    }
+
+
+def print_summary(solver_name, summary):
+    def fmt(value, spec):
+        return "-" if value is None else format(value, spec)
+
+    print(f"{solver_name}: {summary['games']} games")
+    print(f"  success rate   {fmt(summary['success_rate'], '.2%')}")
+    print(
+        f"  moves          mean {fmt(summary['moves_mean'], '.1f')}"
+        f" | p50 {fmt(summary['moves_p50'], 'd')} | p99 {fmt(summary['moves_p99'], 'd')}"
+    )
+    print(f"  wall/game      {fmt(summary['wall_per_game'], '.3f')} s")
+    print(f"  wall/apple     {fmt(summary['wall_per_apple'] and summary['wall_per_apple'] * 1e3, '.3f')} ms")
+
+
+def _matches(result, solver_name, size, replan):
+    return result.get("solver") == solver_name and result.get("size", 32) == size and result.get("replan") == replan
+
+
+def run_sweep(solver_name, seeds, workers, out_path, size=32, replan=None):
+    done = {r["seed"] for r in load_results(out_path) if _matches(r, solver_name, size, replan)}
+    pending = [s for s in seeds if s not in done]
+    if done:
+        print(f"Resuming: {len(seeds) - len(pending)} of {len(seeds)} seeds already in {out_path}")
+    if pending:
+        out_dir = os.path.dirname(out_path)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        with multiprocessing.Pool(workers) as pool, open(out_path, "a") as out:
+            jobs = [(solver_name, s, size, replan) for s in pending]
+            for i, result in enumerate(pool.imap_unordered(play_one, jobs), 1):
+                out.write(json.dumps(result) + "\n")
+                out.flush()
+                status = "ok" if result["success"] else f"FAIL ({result['error']})"
+                print(f"[{i}/{len(pending)}] seed {result['seed']}: {result['moves']} moves, "
+                      f"{result['wall_time']:.2f} s, {status}")
+    wanted = set(seeds)
+    results = [r for r in load_results(out_path) if _matches(r, solver_name, size, replan) and r["seed"] in wanted]
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a solver headless over many seeds in parallel.")
+    parser.add_argument("solver", help="solver module, e.g. solver or solver_classical")
+    parser.add_argument("--seeds", default="0-99", help='seed list/ranges, e.g. "0-99,120" (default 0-99)')
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--size", type=int, default=32, help="board size (default 32)")
+    parser.add_argument("--replan", default=None, choices=REPLAN_POLICIES, help="re-plan policy for solver.py")
+    parser.add_argument("--out", default=None, help="JSON Lines results file (default bench_<solver>.jsonl)")
+    args = parser.parse_args(argv)
+
+    seeds = parse_seeds(args.seeds)
+    out_path = args.out or f"bench_{args.solver.replace('.', '_')}.jsonl"
+    try:
+        results = run_sweep(args.solver, seeds, max(1, args.workers), out_path, args.size, args.replan)
+    except KeyboardInterrupt:
+        print(f"\nInterrupted; finished games are kept in {out_path}")
+        return 130
+    print_summary(args.solver, summarize(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+"""
+Golden-seed regression benchmark for the bundled solvers.
+Plays fixed (solver, size, seed) games and times micro-benchmarks of the
+planner's hot paths, then compares everything with bench_baseline.json: a
+changed move sequence, move count or outcome always fails, and wall times may
+not exceed the baseline by more than the tolerance.
+
+    python bench.py                  # compare with the baseline
+    python bench.py --update         # rewrite the baseline from this run
+    python bench.py --no-timing      # behavior only (e.g. on a different machine)
+"""
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import sys
+import time
+import timeit
+
+import game
+import solver
+from solver import CycleCache, UnionFind
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+# Allowed slowdown over the baseline, and a floor so sub-millisecond noise never fails
+TOLERANCE = 0.3
+MIN_SLACK_S = 0.02
+
+# (solver module, board size, seed); seed 5 on 32x32 used to fail late in the game
+GOLDEN = [
+    ("solver", 16, 0),
+    ("solver", 16, 1),
+    ("solver", 16, 2),
+    ("solver", 32, 1),
+    ("solver", 32, 5),
+    ("solver", 64, 1),
+    ("solver_classical", 32, 0),
+    ("solver_classical", 32, 1),
+    ("solver_classical", 32, 2),
+    ("solver_classical", 64, 1),
+]
+
+
+def case_name(solver_name, size, seed):
+    return f"{solver_name}/{size}/{seed}"
+
+
+def play_golden(solver_name, size, seed):
+    """Play one game, hashing every applied move."""
+    g = game.Game(size, seed=seed)
+    digest = hashlib.sha1()
+    move, move_many = g.move, g.move_many
+
+    def hashed_move(direction):
+        step = g.step_counter
+        move(direction)
+        if g.step_counter != step:
+            digest.update(bytes((direction,)))
+
+    def hashed_move_many(directions):
+        step = g.step_counter
+        try:
+            return move_many(directions)
+        finally:
+            digest.update(bytes(directions[: g.step_counter - step]))
+
+    g.move = hashed_move
+    g.move_many = hashed_move_many
+    module = importlib.import_module(solver_name)
+    error = None
+    start = time.perf_counter()
+    try:
+        module.Solver(g).run()
+    except Exception as exc:
+        error = f"{type(exc).__name__}: {exc}"
+    wall = time.perf_counter() - start
+    return {
+        "success": error is None and not g.game_over,
+        "moves": g.step_counter,
+        "length": g.length,
+        "digest": digest.hexdigest(),
+        "error": error or g.error_message,
+        "wall_time": wall,
+    }
+
+
+def _planning_solver():
+    """A 32x32 solver partway into seed 1, with a body long enough to constrain the planner."""
+    s = solver.Solver(game.Game(32, seed=1), CycleCache(max_bytes=0))
+    while s.length < 160:
+        s.advance()
+    s.apple_pos = s.grid.cell(s.game.measure())
+    return s
+
+
+def micro_benchmarks(repeat=5):
+    """Best-of-`repeat` seconds per call for each hot path."""
+    s = _planning_solver()
+    empty_tree = s.grid.empty_tree
+
+    def shortest_path():
+        s.tree[:] = empty_tree
+        s.calc_shortest_path()
+
+    shortest_path()
+    path_tree = bytes(s.tree)
+
+    def spanning_tree():
+        s.tree[:] = path_tree
+        s.fill_spanning_tree()
+
+    spanning_tree()
+
+    def union_find():
+        uf = UnionFind(256)
+        for i in range(0, 255, 2):
+            uf.union(i, i + 1)
+        mark = uf.mark()
+        for i in range(0, 254, 4):
+            uf.union(i, i + 2)
+        for i in range(256):
+            uf.same(0, i)
+        uf.rollback(mark)
+
+    # A fixed, valid move sequence: the classical solver's first moves on seed 1
+    recorded = []
+    g = game.Game(32, seed=1)
+    move_many = g.move_many
+
+    def record(directions):
+        applied = move_many(directions)
+        recorded.extend(directions[:applied])
+        return applied
+
+    g.move_many = record
+    import solver_classical
+    solver_classical.Solver(g).run()
+    recorded = recorded[:20000]
+
+    import app
+    app.headless_mode = True
+    app.step_wait_enabled = False
+
+    def app_moves():
+        app.new_game(1)
+        move = app.move
+        for d in recorded:
+            move(d)
+
+    # name -> (function, calls per timing run, operations per call)
+    cases = {
+        "solver.calc_shortest_path": (shortest_path, 20, 1),
+        "solver.fill_spanning_tree": (spanning_tree, 50, 1),
+        "solver.calc_hamilton_cycle": (s.calc_hamilton_cycle, 50, 1),
+        "solver.UnionFind": (union_find, 200, 1),
+        "app.move": (app_moves, 1, len(recorded)),
+    }
+    results = {}
+    for name, (func, number, ops) in cases.items():
+        best = min(timeit.repeat(func, number=number, repeat=repeat))
+        results[name] = {"time_s": best / number / ops}
+    return results
+
+
+def compare(current, baseline, check_timing, tolerance):
+    """Return failure messages for `current` against `baseline`."""
+    failures = []
+
+    def slow(name, now, then, slack=0.0):
+        if check_timing and now > then * (1 + tolerance) + slack:
+            failures.append(f"{name}: {now:.6g} s vs baseline {then:.6g} s (+{now / then - 1:.0%})")
+
+    for name, result in current["games"].items():
+        expected = baseline.get("games", {}).get(name)
+        if expected is None:
+            failures.append(f"{name}: not in the baseline (run with --update)")
+            continue
+        for key in ("success", "moves", "length", "digest"):
+            if result[key] != expected[key]:
+                failures.append(f"{name}: {key} {result[key]!r} != baseline {expected[key]!r}")
+        slow(name, result["wall_time"], expected["wall_time"], MIN_SLACK_S)
+    for name, result in current.get("micro", {}).items():
+        expected = baseline.get("micro", {}).get(name)
+        if expected is not None:
+            slow(name, result["time_s"], expected["time_s"])
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Golden-seed regression benchmark for the bundled solvers.")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON (default bench_baseline.json)")
+    parser.add_argument("--update", action="store_true", help="write this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="allowed slowdown (default 0.3 = 30%%)")
+    parser.add_argument("--no-timing", action="store_true", help="only check move sequences and outcomes")
+    parser.add_argument("--no-micro", action="store_true", help="skip the micro-benchmarks")
+    args = parser.parse_args(argv)
+
+    current = {"games": {}}
+    for solver_name, size, seed in GOLDEN:
+        name = case_name(solver_name, size, seed)
+        result = play_golden(solver_name, size, seed)
+        current["games"][name] = result
+        status = "ok" if result["success"] else f"FAIL ({result['error']})"
+        print(f"{name:<28}{result['moves']:>10} moves {result['wall_time']:>9.3f} s  {status}")
+    if not args.no_micro:
+        current["micro"] = micro_benchmarks()
+        for name, result in current["micro"].items():
+            print(f"{name:<28}{result['time_s'] * 1e6:>14.2f} us/call")
+
+    if args.update:
+        with open(args.baseline, "w") as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update first")
+        return 1
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    failures = compare(current, baseline, not args.no_timing, args.tolerance)
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    print("OK" if not failures else f"{len(failures)} regression(s)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+Game and solver checkpoints (app.py --checkpoint / --resume).
+A checkpoint is a JSON file with the whole game position, the game's RNG state
+and the solver's get_state(), so a late-game position can be reopened in the UI
+or in --fast mode without replaying the moves that led to it. Bytes values
+(bodies, trees, cycles) are stored base64-encoded.
+"""
+import base64
+import json
+import os
+
+VERSION = 1
+CHECKPOINT_EVERY = 10000
+
+
+def _encode(value):
+    if isinstance(value, (bytes, bytearray)):
+        return {"__bytes__": base64.b64encode(value).decode("ascii")}
+    raise TypeError(f"Cannot store {type(value).__name__} in a checkpoint")
+
+
+def _decode(obj):
+    if "__bytes__" in obj:
+        return base64.b64decode(obj["__bytes__"])
+    return obj
+
+
+def game_state(game):
+    version, internal, gauss_next = game.rng.getstate()
+    return {
+        "size": game.size,
+        "snake": [list(pos) for pos in game.snake],
+        "apple": list(game.apple) if game.apple is not None else None,
+        "apple_eaten": game.apple_eaten,
+        "grow_pending": game.grow_pending,
+        "step_counter": game.step_counter,
+        "rng": [version, list(internal), gauss_next],
+    }
+
+
+def restore_game(game, state):
+    """Put `game` (of the checkpoint's size) into the saved position."""
+    if game.size != state["size"]:
+        raise ValueError(f"Checkpoint is for a {state['size']}x{state['size']} board, not {game.size}x{game.size}")
+    apple = state["apple"]
+    game.restore(
+        [tuple(pos) for pos in state["snake"]],
+        tuple(apple) if apple is not None else None,
+        state["apple_eaten"],
+        state["grow_pending"],
+        state["step_counter"],
+    )
+    version, internal, gauss_next = state["rng"]
+    game.rng.setstate((version, tuple(internal), gauss_next))
+
+
+def save(path, game, solver=None, seed=None, solver_name=None):
+    """Write a checkpoint; the file is replaced atomically so a crash mid-write keeps the old one."""
+    data = {
+        "version": VERSION,
+        "seed": seed,
+        "solver": solver_name,
+        "game": game_state(game),
+        "solver_state": solver.get_state() if solver is not None else None,
+    }
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, default=_encode)
+    os.replace(tmp_path, path)
+
+
+def load(path):
+    with open(path) as f:
+        data = json.load(f, object_hook=_decode)
+    if data.get("version") != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} checkpoint")
+    return data
+
+
+class Checkpointer:
+    """
+    Writes a checkpoint of a running solver every `every` moves and when it crashes.
+    Solvers call tick() at points where their own state matches the game's, so
+    the periodic checkpoint lands on the first such point past each multiple.
+    """
+
+    def __init__(self, path, seed=None, solver_name=None, every=CHECKPOINT_EVERY):
+        self.path = path
+        self.seed = seed
+        self.solver_name = solver_name
+        self.every = every
+        self.next_step = None
+        self.saved_step = None
+
+    def save(self, solver):
+        save(self.path, solver.game, solver, self.seed, self.solver_name)
+        self.saved_step = solver.game.step_counter
+
+    def tick(self, solver):
+        step = solver.game.step_counter
+        if self.next_step is None:
+            self.next_step = (step // self.every + 1) * self.every
+        elif step >= self.next_step:
+            self.save(solver)
+            self.next_step = (step // self.every + 1) * self.every
+
+    def crashed(self, solver):
+        """
+        Save the position the solver failed from; returns False if the game is
+        already lost or the solver cannot resume from there (solver_classical
+        mid-lap), which leaves the last periodic checkpoint in place.
+        """
+        if solver.game.game_over:
+            # A move was rejected mid-batch, so the solver's copy no longer matches
+            return False
+        if not getattr(solver, "resumable", True):
+            return False
+        self.save(solver)
+        return True
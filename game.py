@@ -0,0 +1,266 @@
+"""
+Headless snake game rules.
+A Game instance owns one board and exposes the solver API
+(move/measure/get_pos_x/get_pos_y/get_world_size) as methods, so any number of
+games can run side by side in one process.
+"""
+import random
+from collections import deque
+from itertools import compress
+
+# Direction constants expected by the solvers
+North, East, South, West = 0, 1, 2, 3
+
+DIR_VECS = {
+    # y+ is north (up), as expected by solver.py
+    North: (0, 1),
+    East: (1, 0),
+    South: (0, -1),
+    West: (-1, 0),
+}
+
+
+class FreeCellIndex:
+    """
+    Free-cell counts per board row, kept in a Fenwick tree over the rows.
+    A move only adjusts the pending per-row deltas; kth() first folds the
+    nonzero ones into the tree, then descends it to the k-th free cell's row in
+    O(log rows) and finds the cell by halving the row with bytearray.count.
+    """
+
+    def __init__(self, occupied, width):
+        self.occupied = occupied
+        self.width = width
+        rows = len(occupied) // width
+        self.rows = rows
+        tree = [0] + [width - occupied.count(1, y * width, y * width + width) for y in range(rows)]
+        self.count = sum(tree)
+        for i in range(1, rows + 1):
+            j = i + (i & -i)
+            if j <= rows:
+                tree[j] += tree[i]
+        self.tree = tree
+        self.top = 1 << (rows.bit_length() - 1) if rows else 0
+        self.delta = [0] * rows
+
+    def add(self, cell, delta):
+        self.count += delta
+        self.delta[cell // self.width] += delta
+
+    def swap(self, freed, taken):
+        """Free one cell and occupy another."""
+        width = self.width
+        i = freed // width
+        j = taken // width
+        if i != j:
+            delta = self.delta
+            delta[i] += 1
+            delta[j] -= 1
+
+    def flush(self):
+        """Apply the pending row deltas to the tree."""
+        tree = self.tree
+        delta = self.delta
+        rows = self.rows
+        # compress() finds the touched rows at C speed
+        for row in list(compress(range(rows), delta)):
+            d = delta[row]
+            delta[row] = 0
+            i = row + 1
+            while i <= rows:
+                tree[i] += d
+                i += i & -i
+
+    def kth(self, k):
+        """Return the id of the k-th (0-based) free cell."""
+        self.flush()
+        tree = self.tree
+        row = 0
+        step = self.top
+        while step:
+            nxt = row + step
+            if nxt <= self.rows and tree[nxt] <= k:
+                row = nxt
+                k -= tree[nxt]
+            step >>= 1
+        # Halve the row until the k-th free cell is the first free one left
+        occupied = self.occupied
+        lo = row * self.width
+        hi = lo + self.width
+        while hi - lo > 16:
+            mid = (lo + hi) // 2
+            free = (mid - lo) - occupied.count(1, lo, mid)
+            if k < free:
+                hi = mid
+            else:
+                k -= free
+                lo = mid
+        cell = occupied.find(0, lo)
+        for _ in range(k):
+            cell = occupied.find(0, cell + 1)
+        return cell
+
+
+class Game:
+    def __init__(self, size=32, seed=None, rng=None):
+        self.size = size
+        # random.Random(seed) draws the same apples as random.seed(seed) did
+        self.rng = rng if rng is not None else random.Random(seed)
+        self.snake = deque([(0, 0)])  # (x, y) from tail to head
+        # Occupancy by row-major cell id (y * size + x), plus an order-statistic
+        # index of free cells so apple spawns never scan the board
+        self.occupied = bytearray(size * size)
+        self.occupied[0] = 1
+        self.free_cells = FreeCellIndex(self.occupied, size)
+        self.apple = None
+        self.apple_eaten = True
+        self.step_counter = 0
+        self.game_over = False
+        self.error_message = None
+        self.grow_pending = 0
+
+    def restore(self, snake, apple, apple_eaten, grow_pending, step_counter):
+        """Replace the board with a saved position (snake cells from tail to head)."""
+        size = self.size
+        self.snake = deque(snake)
+        self.occupied = bytearray(size * size)
+        for x, y in self.snake:
+            self.occupied[y * size + x] = 1
+        self.free_cells = FreeCellIndex(self.occupied, size)
+        self.apple = apple
+        self.apple_eaten = apple_eaten
+        self.grow_pending = grow_pending
+        self.step_counter = step_counter
+        self.game_over = False
+        self.error_message = None
+
+    @property
+    def length(self):
+        return len(self.snake) + self.grow_pending
+
+    def get_world_size(self):
+        return self.size
+
+    def get_pos_x(self):
+        return self.snake[-1][0]
+
+    def get_pos_y(self):
+        return self.snake[-1][1]
+
+    def _spawn_apple(self):
+        self.apple_eaten = False
+        free_cells = self.free_cells
+        if not free_cells.count:
+            self.apple = None
+            return None
+        # Same draw as random.choice over the row-major list of free cells
+        cell = free_cells.kth(self.rng.choice(range(free_cells.count)))
+        self.apple = (cell % self.size, cell // self.size)
+        return self.apple
+
+    def measure(self):
+        """Return the current apple position, creating one if needed."""
+        if self.apple is None or self.apple_eaten:
+            self._spawn_apple()
+        return self.apple
+
+    def move(self, direction):
+        """Advance the snake by one cell in the given direction."""
+        if direction not in DIR_VECS:
+            self.error_message = f"Invalid direction: {direction}"
+            return
+        if self.game_over:
+            return
+
+        dx, dy = DIR_VECS[direction]
+        hx, hy = self.snake[-1]
+        nx = hx + dx
+        ny = hy + dy
+        size = self.size
+
+        # Bounds check
+        if nx < 0 or ny < 0 or nx >= size or ny >= size:
+            self.game_over = True
+            self.error_message = f"Hit the wall at {(nx, ny)}"
+            raise RuntimeError(self.error_message)
+
+        # Self-collision check (moving into the tail is allowed if it vacates)
+        # Tail only vacates if we will pop it this step
+        ate = self.apple is not None and (nx, ny) == self.apple
+        will_pop_tail = self.grow_pending == 0 and not ate
+        if self.occupied[ny * size + nx] and not (will_pop_tail and (nx, ny) == self.snake[0]):
+            self.game_over = True
+            self.error_message = f"Ran into itself at {(nx, ny)}"
+            raise RuntimeError(self.error_message)
+
+        head_cell = ny * size + nx
+        self.snake.append((nx, ny))
+        # Apply previously scheduled growth: if pending, skip pop this turn
+        if self.grow_pending > 0:
+            self.grow_pending -= 1
+            self.free_cells.add(head_cell, -1)
+        else:
+            tx, ty = self.snake.popleft()
+            tail_cell = ty * size + tx
+            self.occupied[tail_cell] = 0
+            self.free_cells.swap(tail_cell, head_cell)
+        # Mark the head after the pop so a head entering the vacated tail cell stays occupied
+        self.occupied[head_cell] = 1
+        # Eating schedules growth for the *next* move
+        if ate:
+            self.apple_eaten = True
+            self.grow_pending += 1
+
+        self.step_counter += 1
+
+    def move_many(self, directions):
+        """
+        Apply moves in order until one eats the apple; returns how many were applied.
+        Same rules as move(), checked in one pass over local state.
+        """
+        if self.game_over:
+            return 0
+        size = self.size
+        snake = self.snake
+        occupied = self.occupied
+        free_cells = self.free_cells
+        apple = self.apple
+        hx, hy = snake[-1]
+        applied = 0
+        try:
+            for direction in directions:
+                vec = DIR_VECS.get(direction)
+                if vec is None:
+                    self.error_message = f"Invalid direction: {direction}"
+                    break
+                nx = hx + vec[0]
+                ny = hy + vec[1]
+                if nx < 0 or ny < 0 or nx >= size or ny >= size:
+                    self.game_over = True
+                    self.error_message = f"Hit the wall at {(nx, ny)}"
+                    raise RuntimeError(self.error_message)
+                head_cell = ny * size + nx
+                ate = (nx, ny) == apple
+                if occupied[head_cell] and not (self.grow_pending == 0 and not ate and (nx, ny) == snake[0]):
+                    self.game_over = True
+                    self.error_message = f"Ran into itself at {(nx, ny)}"
+                    raise RuntimeError(self.error_message)
+                snake.append((nx, ny))
+                if self.grow_pending > 0:
+                    self.grow_pending -= 1
+                    free_cells.add(head_cell, -1)
+                else:
+                    tx, ty = snake.popleft()
+                    tail_cell = ty * size + tx
+                    occupied[tail_cell] = 0
+                    free_cells.swap(tail_cell, head_cell)
+                occupied[head_cell] = 1
+                hx, hy = nx, ny
+                applied += 1
+                if ate:
+                    self.apple_eaten = True
+                    self.grow_pending += 1
+                    break
+        finally:
+            self.step_counter += applied
+        return applied
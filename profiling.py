@@ -0,0 +1,129 @@
+"""
+Opt-in instrumentation for the solver and game loop (app.py --profile).
+Nothing is wrapped until Profiler.enable() is called, so normal runs pay nothing;
+enabled runs record call counts and timings per phase plus per-apple latency and
+moves, and dump them as JSON.
+"""
+import functools
+import json
+import math
+import time
+
+import game
+import solver
+import solver_classical
+
+# (owner, attribute, report name) pairs timed by enable()
+TARGETS = [
+    (solver.Solver, "plan", "solver.plan"),
+    (solver.Solver, "calc_shortest_path", "solver.calc_shortest_path"),
+    (solver.Solver, "fill_spanning_tree", "solver.fill_spanning_tree"),
+    (solver.Solver, "calc_hamilton_cycle", "solver.calc_hamilton_cycle"),
+    (solver_classical.Solver, "step", "solver_classical.step"),
+    (solver_classical.Solver, "emit", "solver_classical.emit"),
+    (game.Game, "move", "game.move"),
+    (game.Game, "move_many", "game.move_many"),
+    (game.Game, "_spawn_apple", "game.spawn_apple"),
+]
+
+
+class Profiler:
+    def __init__(self):
+        self.timings = {}  # name -> [calls, total seconds, max seconds]
+        self.apples = []  # (step_counter, snake length, perf_counter) at each spawn
+        self._patched = []
+
+    def record(self, name, elapsed):
+        entry = self.timings.get(name)
+        if entry is None:
+            self.timings[name] = [1, elapsed, elapsed]
+            return
+        entry[0] += 1
+        entry[1] += elapsed
+        if elapsed > entry[2]:
+            entry[2] = elapsed
+
+    def wrap(self, owner, attr, name):
+        """Time every call of owner.attr under `name` until disable()."""
+        original = getattr(owner, attr)
+        record = self.record
+        perf_counter = time.perf_counter
+
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                record(name, perf_counter() - start)
+
+        self._patched.append((owner, attr, original))
+        setattr(owner, attr, timed)
+
+    def enable(self, render_module=None):
+        """Instrument the solvers, the game core and (optionally) a module's draw_state."""
+        for owner, attr, name in TARGETS:
+            self.wrap(owner, attr, name)
+        if render_module is not None:
+            self.wrap(render_module, "draw_state", "render.draw_state")
+        # Per-apple bookkeeping rides on the spawn, which happens once per apple
+        spawn = game.Game._spawn_apple
+        apples = self.apples
+
+        def spawn_and_log(game_self):
+            apples.append((game_self.step_counter, game_self.length, time.perf_counter()))
+            return spawn(game_self)
+
+        self._patched.append((game.Game, "_spawn_apple", spawn))
+        game.Game._spawn_apple = spawn_and_log
+        solver.Solver.profiler = self
+
+    def disable(self):
+        for owner, attr, original in reversed(self._patched):
+            setattr(owner, attr, original)
+        self._patched.clear()
+        solver.Solver.profiler = None
+
+    def apple_stats(self):
+        """Per-apple latency histogram and mean moves per apple by snake length."""
+        latency_hist = {}
+        by_length = {}
+        for (step0, length0, t0), (step1, _, t1) in zip(self.apples, self.apples[1:]):
+            # Latency buckets are powers of two in milliseconds
+            ms = (t1 - t0) * 1e3
+            bucket = 2 ** math.ceil(math.log2(ms)) if ms > 0 else 0
+            latency_hist[bucket] = latency_hist.get(bucket, 0) + 1
+            band = length0 // 64 * 64
+            moves, count = by_length.get(band, (0, 0))
+            by_length[band] = (moves + step1 - step0, count + 1)
+        return {
+            "apples": max(0, len(self.apples) - 1),
+            "latency_ms_hist": {f"<={k}": v for k, v in sorted(latency_hist.items())},
+            "moves_per_apple_by_length": {
+                f"{band}-{band + 63}": {"apples": count, "mean_moves": moves / count}
+                for band, (moves, count) in sorted(by_length.items())
+            },
+        }
+
+    def report(self):
+        return {
+            "timings": {
+                name: {
+                    "calls": calls,
+                    "total_s": total,
+                    "mean_us": total / calls * 1e6,
+                    "max_us": peak * 1e6,
+                }
+                for name, (calls, total, peak) in sorted(self.timings.items(), key=lambda kv: -kv[1][1])
+            },
+            **self.apple_stats(),
+        }
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+    def print_summary(self):
+        print(f"{'phase':<36}{'calls':>10}{'total s':>10}{'mean us':>12}")
+        for name, row in self.report()["timings"].items():
+            print(f"{name:<36}{row['calls']:>10}{row['total_s']:>10.3f}{row['mean_us']:>12.1f}")
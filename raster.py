@@ -0,0 +1,300 @@
+"""
+Offscreen frame rasterizer for exporting games to video (needs NumPy, not Tk).
+Draws boards the way app.py does (grid, snake cells and connectors, head and
+apple, and optionally the solver's cycle arrows and tree edges) into RGB
+arrays, then writes every `--every`-th step as a PPM/PNG file or as raw rgb24
+frames on stdout for an external encoder:
+
+    python raster.py replay_5.snkr --every 50 --out frames/
+    python raster.py replay_5.snkr --every 50 --pipe | ffmpeg -f rawvideo -pix_fmt rgb24 -s 1024x1024 -r 60 -i - run.mp4
+    python raster.py solver --seed 1 --every 100 --overlays --out frames/
+
+A replay file is read with replay.ReplayReader; a solver name plays a live game
+instead, which is the only source of cycle and tree overlays.
+"""
+import argparse
+import importlib
+import os
+import struct
+import sys
+import time
+import zlib
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from game import Game
+
+# Same palette and proportions as app.py's BoardRenderer
+BG_COLOR = "#0b1021"
+GRID_COLOR = "#1e293b"
+SNAKE_COLOR = "#22c55e"
+HEAD_COLOR = "#16a34a"
+APPLE_COLOR = "#f97316"
+TREE_COLORS = {0: "#334155", 1: "#b91c1c", 2: "#38bdf8"}
+CYCLE_COLOR = "#60a5fa"
+MAX_FRAME_PX = 1024
+DETAIL_MIN_PX = 8
+
+# Quarter turns (counterclockwise) from the East arrow stamp to each direction's
+_ARROW_ROTATIONS = {0: 1, 1: 0, 2: 3, 3: 2}
+
+
+def _rgb(color):
+    return tuple(int(color[i:i + 2], 16) for i in (1, 3, 5))
+
+
+class Rasterizer:
+    """
+    Renders board states of one size into (height, width, 3) uint8 arrays.
+    Per-cell pieces (snake cells with their connectors, cycle arrows) are
+    precomputed stamps, so a frame is a few whole-board masked assignments.
+    """
+
+    def __init__(self, size, cell_px=None):
+        if np is None:
+            raise RuntimeError("raster.py needs NumPy (pip install numpy)")
+        self.size = size
+        self.cell_px = cell_px or max(2, min(32, MAX_FRAME_PX // size))
+        self.detailed = self.cell_px >= DETAIL_MIN_PX
+        c = self.cell_px
+        self.shape = (size * c, size * c, 3)
+        self.background = np.empty(self.shape, dtype=np.uint8)
+        self.background[:] = _rgb(BG_COLOR)
+        if self.detailed:
+            for i in range(1, size):
+                self.background[i * c, :] = _rgb(GRID_COLOR)
+                self.background[:, i * c] = _rgb(GRID_COLOR)
+
+        # Snake stamps: 0 is empty, 1 + bits is a body cell joined towards each set direction bit
+        inset = c // 8
+        half = c // 2
+        width = c // 4
+        lo, hi = half - width // 2, half - width // 2 + max(width, 1)
+        self.snake_stamps = np.zeros((17, c, c), dtype=bool)
+        for bits in range(16):
+            stamp = self.snake_stamps[bits + 1]
+            stamp[inset:c - inset, inset:c - inset] = True
+            if not self.detailed:
+                continue
+            if bits & 1:  # North (up on screen)
+                stamp[:half, lo:hi] = True
+            if bits & 2:  # East
+                stamp[lo:hi, half:] = True
+            if bits & 4:  # South
+                stamp[half:, lo:hi] = True
+            if bits & 8:  # West
+                stamp[lo:hi, :half] = True
+
+        # Arrow stamps: 0-3 by direction, 4 for no arrow
+        east = np.zeros((c, c), dtype=bool)
+        tip = half + int(c * 0.6)
+        head_len = max(2, min(8, c // 4))
+        for col in range(half, min(tip, c)):
+            east[half - 1:half + 1, col] = True
+            back = tip - col
+            if back <= head_len:
+                spread = int(round(3 * back / head_len))
+                east[max(0, half - spread):half + spread + 1, col] = True
+        self.arrow_stamps = np.zeros((5, c, c), dtype=bool)
+        for d, turns in _ARROW_ROTATIONS.items():
+            self.arrow_stamps[d] = np.rot90(east, turns)
+
+        # Direction of each move (dx, dy) -> dir, indexed by (dx + 1) * 3 + dy + 1
+        self.dir_of_step = np.full(9, 0, dtype=np.uint8)
+        for d, (dx, dy) in enumerate(((0, 1), (1, 0), (0, -1), (-1, 0))):
+            self.dir_of_step[(dx + 1) * 3 + dy + 1] = d
+
+    def _paint(self, frame, cell_stamps, index_grid, color):
+        """Paint stamps[index_grid[row, col]] of every cell in one masked assignment."""
+        n, c = self.size, self.cell_px
+        mask = cell_stamps[index_grid].transpose(0, 2, 1, 3).reshape(n * c, n * c)
+        frame[mask] = color
+
+    def _cell_box(self, x, y, inset):
+        c = self.cell_px
+        row, col = (self.size - 1 - y) * c, x * c
+        return slice(row + inset, row + c - inset), slice(col + inset, col + c - inset)
+
+    def _draw_tree(self, frame, tree):
+        """Tree edges between block centers, as Snapshot.tree restrictions (slot = block * 4 + dir)."""
+        n, c = self.size, self.cell_px
+        m = n // 2
+        for bx in range(m):
+            for by in range(m):
+                block = bx * m + by
+                # Block centers sit on the grid corner shared by the block's four cells
+                row, col = (n - 1 - 2 * by) * c, (2 * bx + 1) * c
+                if bx + 1 < m:
+                    status = tree[block * 4 + 1]
+                    w = 1 if status == 1 else 3
+                    frame[row - w // 2:row - w // 2 + w, col:col + 2 * c + 1] = _rgb(TREE_COLORS.get(status, "#475569"))
+                if by > 0:
+                    status = tree[block * 4 + 2]
+                    w = 1 if status == 1 else 3
+                    frame[row:row + 2 * c + 1, col - w // 2:col - w // 2 + w] = _rgb(TREE_COLORS.get(status, "#475569"))
+
+    def render(self, snake, apple, snapshot=None):
+        """
+        One frame for a snake (cells from tail to head) and apple; `snapshot` is
+        a solver.Snapshot whose cycle and tree are drawn underneath when given.
+        """
+        n = self.size
+        frame = self.background.copy()
+        if snapshot is not None and self.detailed:
+            self._draw_tree(frame, snapshot.tree)
+            # Snapshot cycles are indexed x * n + y; rows run top to bottom
+            cycle = np.frombuffer(bytes(snapshot.cycle), dtype=np.uint8).reshape(n, n)
+            self._paint(frame, self.arrow_stamps, cycle.T[::-1], _rgb(CYCLE_COLOR))
+        if apple is not None:
+            frame[self._cell_box(*apple, self.cell_px // 16)] = _rgb(APPLE_COLOR)
+        if snake:
+            cells = np.asarray(snake, dtype=np.intp).reshape(-1, 2)
+            rows, cols = n - 1 - cells[:, 1], cells[:, 0]
+            bits = np.zeros((n, n), dtype=np.uint8)
+            if len(cells) > 1:
+                step = cells[1:] - cells[:-1]
+                dirs = self.dir_of_step[(step[:, 0] + 1) * 3 + step[:, 1] + 1]
+                np.bitwise_or.at(bits, (rows[:-1], cols[:-1]), (1 << dirs).astype(np.uint8))
+                np.bitwise_or.at(bits, (rows[1:], cols[1:]), (1 << ((dirs + 2) % 4)).astype(np.uint8))
+            index = np.zeros((n, n), dtype=np.uint8)
+            index[rows, cols] = bits[rows, cols] + 1
+            self._paint(frame, self.snake_stamps, index, _rgb(SNAKE_COLOR))
+            frame[self._cell_box(*snake[-1], self.cell_px // 8)] = _rgb(HEAD_COLOR)
+        return frame
+
+
+def encode_ppm(frame):
+    height, width, _ = frame.shape
+    return b"P6 %d %d 255\n" % (width, height) + frame.tobytes()
+
+
+def encode_png(frame, level=6):
+    """Minimal truecolor PNG writer (no filtering) so Pillow is not needed."""
+    height, width, _ = frame.shape
+    rows = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+    rows[:, 1:] = frame.reshape(height, width * 3)
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows.tobytes(), level)) + chunk(b"IEND", b"")
+
+
+class FrameWriter:
+    """Numbered image files in a directory, or raw rgb24 frames on a binary stream."""
+
+    def __init__(self, out_dir=None, fmt="ppm", stream=None):
+        self.out_dir = out_dir
+        self.fmt = fmt
+        self.stream = stream
+        self.count = 0
+        if out_dir is not None:
+            os.makedirs(out_dir, exist_ok=True)
+
+    def write(self, frame):
+        if self.stream is not None:
+            self.stream.write(frame.tobytes())
+        else:
+            data = encode_png(frame) if self.fmt == "png" else encode_ppm(frame)
+            with open(os.path.join(self.out_dir, f"frame_{self.count:06d}.{self.fmt}"), "wb") as f:
+                f.write(data)
+        self.count += 1
+
+
+def export_replay(path, writer, every, cell_px=None):
+    """Write the recorded game's position every `every` steps, plus its final position."""
+    from replay import ReplayReader
+
+    reader = ReplayReader(path)
+    rasterizer = Rasterizer(reader.size, cell_px)
+    steps = list(range(reader.start_step, reader.final_step, every)) + [reader.final_step]
+    for step in steps:
+        g = reader.seek(step)
+        writer.write(rasterizer.render(list(g.snake), g.apple))
+    return rasterizer
+
+
+def export_live(solver_name, size, seed, writer, every, cell_px=None, overlays=False):
+    """
+    Play a game with a solver module's Solver and write its position every
+    `every` steps, with the solver's current cycle and tree if `overlays`.
+    """
+    rasterizer = Rasterizer(size, cell_px)
+    g = Game(size, seed=seed)
+    s = importlib.import_module(solver_name).Solver(g)
+    if overlays and hasattr(s, "publish_snapshots"):
+        s.publish_snapshots = True
+
+    def emit():
+        writer.write(rasterizer.render(list(g.snake), g.apple, getattr(s, "snapshot", None)))
+
+    move, move_many = g.move, g.move_many
+
+    def framed_move(direction):
+        move(direction)
+        if g.step_counter % every == 0:
+            emit()
+
+    def framed_move_many(directions):
+        # Split batches at frame steps; move_many still stops after an apple
+        applied = 0
+        while applied < len(directions):
+            chunk = directions[applied:applied + every - g.step_counter % every]
+            length = g.length
+            done = move_many(chunk)
+            applied += done
+            if done and g.step_counter % every == 0:
+                emit()
+            if done < len(chunk) or g.length > length:
+                break
+        return applied
+
+    g.move = framed_move
+    g.move_many = framed_move_many
+    emit()
+    try:
+        s.run()
+    finally:
+        if g.step_counter % every:
+            emit()
+    return rasterizer
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render a replay or a live game to image files or raw frames.")
+    parser.add_argument("source", help="replay file (.snkr) or solver module name")
+    parser.add_argument("--every", type=int, default=100, help="steps between frames (default 100)")
+    parser.add_argument("--out", default="frames", help="directory for numbered frames (default frames/)")
+    parser.add_argument("--format", choices=("ppm", "png"), default="ppm")
+    parser.add_argument("--pipe", action="store_true", help="write raw rgb24 frames to stdout instead")
+    parser.add_argument("--cell-px", type=int, default=None, help="pixels per cell (default: fit 1024 px)")
+    parser.add_argument("--seed", type=int, default=None, help="seed for a live game")
+    parser.add_argument("--size", type=int, default=32, help="board size for a live game (default 32)")
+    parser.add_argument("--overlays", action="store_true", help="draw the cycle and tree (live games only)")
+    args = parser.parse_args(argv)
+
+    if args.pipe:
+        writer = FrameWriter(stream=sys.stdout.buffer)
+    else:
+        writer = FrameWriter(args.out, args.format)
+    every = max(1, args.every)
+    start = time.perf_counter()
+    if os.path.exists(args.source):
+        rasterizer = export_replay(args.source, writer, every, args.cell_px)
+    else:
+        rasterizer = export_live(args.source, args.size, args.seed, writer, every, args.cell_px, args.overlays)
+    height, width, _ = rasterizer.shape
+    where = "stdout" if args.pipe else args.out
+    print(
+        f"{writer.count} frames of {width}x{height} to {where} in {time.perf_counter() - start:.1f} s",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""
+Client for server.py: plays a served game from another process.
+RemoteGame has the same API as game.Game (move/move_many/measure/get_pos_x/
+get_pos_y/get_world_size), so the bundled solvers run against it unchanged,
+one round trip per call. send_moves()/replies() pipeline several move batches
+into a single round trip for clients that know their moves in advance.
+
+    python server.py --port 7777 &
+    python remote.py solver --seeds 0-9 --port 7777 --workers 4
+"""
+import argparse
+import importlib
+import multiprocessing
+import socket
+import sys
+import time
+
+from batch import parse_seeds, print_summary, summarize
+from server import (
+    APPLIED, FRAME, INFO, NEW, OP_INFO, OP_MEASURE, OP_MOVES, OP_NEW, OP_POS, POINT, POS,
+    STATUS_GAME_OVER, STATUS_OK, WORLD_SIZE,
+)
+
+
+class RemoteGame:
+    """A game played on a server; `address` is a (host, port) pair or a Unix socket path."""
+
+    def __init__(self, address, size=32, seed=None):
+        if isinstance(address, str):
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.connect(address)
+        self.stream = self.sock.makefile("rb")
+        self.pending = 0  # requests sent whose replies have not been read
+        self.round_trips = 0
+        self.game_over = False
+        self.error_message = None
+        self.new_game(size, seed)
+
+    def close(self):
+        self.stream.close()
+        self.sock.close()
+
+    def send(self, op, payload=b""):
+        self.sock.sendall(FRAME.pack(op, len(payload)) + payload)
+        self.pending += 1
+
+    def recv(self):
+        """Read the next reply; a game-over reply raises RuntimeError like Game.move does."""
+        header = self.stream.read(FRAME.size)
+        if len(header) < FRAME.size:
+            raise ConnectionError("Server closed the connection")
+        status, length = FRAME.unpack(header)
+        payload = self.stream.read(length)
+        self.pending -= 1
+        if status == STATUS_OK:
+            return payload
+        message = payload.decode()
+        if status == STATUS_GAME_OVER:
+            self.game_over = True
+            self.error_message = message
+            raise RuntimeError(message)
+        raise ValueError(message)
+
+    def request(self, op, payload=b""):
+        self.send(op, payload)
+        self.round_trips += 1
+        return self.recv()
+
+    def new_game(self, size=32, seed=None):
+        self.size = WORLD_SIZE.unpack(self.request(OP_NEW, NEW.pack(size, seed is not None, seed or 0)))[0]
+        self.game_over = False
+        self.error_message = None
+
+    def get_world_size(self):
+        return self.size
+
+    def get_pos_x(self):
+        return POS.unpack(self.request(OP_POS))[0]
+
+    def get_pos_y(self):
+        return POS.unpack(self.request(OP_POS))[1]
+
+    def measure(self):
+        x, y = POINT.unpack(self.request(OP_MEASURE))
+        return (x, y) if x >= 0 else None
+
+    def move(self, direction):
+        self.move_many((direction,))
+
+    def move_many(self, directions):
+        return APPLIED.unpack(self.request(OP_MOVES, bytes(directions)))[0]
+
+    def send_moves(self, directions):
+        """Queue a move batch without waiting; read its applied count with replies()."""
+        self.send(OP_MOVES, bytes(directions))
+
+    def replies(self):
+        """Applied counts of every queued batch, in order, for one round trip in total."""
+        self.round_trips += 1
+        counts = []
+        try:
+            while self.pending:
+                counts.append(APPLIED.unpack(self.recv())[0])
+        finally:
+            # Drop the replies after a game over so the next request lines up
+            while self.pending:
+                try:
+                    self.recv()
+                except RuntimeError:
+                    pass
+        return counts
+
+    def info(self):
+        """(steps, length, game over) as the server sees them."""
+        steps, length, over = INFO.unpack(self.request(OP_INFO))
+        return steps, length, bool(over)
+
+
+def play_one(job):
+    """Play one seed with a solver module against the server."""
+    solver_name, seed, size, address = job
+    module = importlib.import_module(solver_name)
+    game = RemoteGame(address, size, seed)
+    error = None
+    start = time.perf_counter()
+    try:
+        module.Solver(game).run()
+    except Exception as exc:
+        error = f"{type(exc).__name__}: {exc}"
+    wall = time.perf_counter() - start
+    steps, length, over = game.info()
+    game.close()
+    return {
+        "solver": solver_name,
+        "seed": seed,
+        "size": size,
+        "success": error is None and not over,
+        "moves": steps,
+        "length": length,
+        "apples": length - 1,
+        "wall_time": wall,
+        "error": error or game.error_message,
+        "round_trips": game.round_trips,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a solver against games served by server.py.")
+    parser.add_argument("solver", help="solver module with a Solver class, e.g. solver or solver_classical")
+    where = parser.add_mutually_exclusive_group()
+    where.add_argument("--port", type=int, default=7777, help="server TCP port on --host (default 7777)")
+    where.add_argument("--unix", default=None, help="server Unix socket path")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--seeds", default="0", help='seed list/ranges, e.g. "0-9" (default 0)')
+    parser.add_argument("--size", type=int, default=32, help="board size (default 32)")
+    parser.add_argument("--workers", type=int, default=1, help="games played at once, one process each")
+    args = parser.parse_args(argv)
+
+    address = args.unix or (args.host, args.port)
+    jobs = [(args.solver, seed, args.size, address) for seed in parse_seeds(args.seeds)]
+    results = []
+    with multiprocessing.Pool(max(1, min(args.workers, len(jobs)))) as pool:
+        for result in pool.imap_unordered(play_one, jobs):
+            results.append(result)
+            status = "ok" if result["success"] else f"FAIL ({result['error']})"
+            print(f"seed {result['seed']}: {result['moves']} moves, {result['round_trips']} round trips, "
+                  f"{result['wall_time']:.2f} s, {status}")
+    print_summary(args.solver, summarize(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""
+Compare solver.py's re-planning policies.
+Plays the same seeds with each policy and reports the trade-off between
+moves and planning time: full re-plans, their total time, and wall time.
+
+    python replan.py --seeds 0-3
+    python replan.py --policies fixed,budget --budget 25
+"""
+import argparse
+import statistics
+import sys
+import time
+
+import game
+import solver
+from batch import parse_seeds
+
+
+def play(policy, size, seed):
+    g = game.Game(size, seed=seed)
+    s = solver.Solver(g, replan=policy)
+    start = time.perf_counter()
+    try:
+        s.run()
+        error = None
+    except Exception as exc:
+        error = f"{type(exc).__name__}: {exc}"
+    return {
+        "success": error is None and not g.game_over,
+        "moves": g.step_counter,
+        "replans": s.replans,
+        "replan_time": s.replan_seconds,
+        "wall_time": time.perf_counter() - start,
+        "error": error or g.error_message,
+    }
+
+
+def make_policy(name, args):
+    if name == "fixed":
+        return solver.FixedReplan(args.every)
+    if name == "adaptive":
+        return solver.AdaptiveReplan(args.every)
+    if name == "budget":
+        return solver.BudgetReplan(args.budget)
+    raise ValueError(f"Unknown policy {name!r}; choose from {', '.join(solver.REPLAN_POLICIES)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare re-planning policies on the same seeds.")
+    parser.add_argument("--policies", default=",".join(solver.REPLAN_POLICIES), help="comma-separated (default all)")
+    parser.add_argument("--seeds", default="0-3", help='seed list/ranges (default 0-3)')
+    parser.add_argument("--size", type=int, default=32, help="board size (default 32)")
+    parser.add_argument("--every", type=int, default=16, help="moves per segment for fixed/adaptive (default 16)")
+    parser.add_argument("--budget", type=float, default=50, help="planning work units per move for budget (default 50)")
+    args = parser.parse_args(argv)
+
+    seeds = parse_seeds(args.seeds)
+    print(f"{'policy':<10}{'ok':>6}{'moves':>12}{'re-plans':>10}{'plan s':>9}{'wall s':>9}{'ms/re-plan':>12}")
+    for name in args.policies.split(","):
+        results = [play(make_policy(name, args), args.size, seed) for seed in seeds]
+        for seed, result in zip(seeds, results):
+            if not result["success"]:
+                print(f"  {name} seed {seed} failed: {result['error']}")
+        replans = sum(r["replans"] for r in results)
+        replan_time = sum(r["replan_time"] for r in results)
+        print(
+            f"{name:<10}{sum(r['success'] for r in results):>3}/{len(results):<2}"
+            f"{statistics.fmean(r['moves'] for r in results):>12.1f}"
+            f"{replans / len(results):>10.1f}"
+            f"{replan_time / len(results):>9.2f}"
+            f"{statistics.fmean(r['wall_time'] for r in results):>9.2f}"
+            f"{replan_time / replans * 1e3 if replans else 0:>12.2f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,276 @@
+"""
+Compact game replays (app.py --record / --replay).
+A game is determined by its seed and moves, so a replay stores moves at 2 bits
+each plus every apple spawn, with periodic keyframes (full snake and apple) and
+a keyframe index at the end of the file so a reader can seek to any step by
+replaying at most one keyframe interval.
+
+Layout: header, then a stream of records
+    M  <u16 count> <packed moves, 4 per byte, first move in the low bits>
+    A  <u32 step> <u32 apple cell>        apple spawned once `step` moves were made
+    K  <u32 step> <u32 apple cell> <u8 apple eaten> <u32 grow pending>
+       <u32 length> <u16 cell> * length   snake from tail to head
+    E  <u32 step> <u8 game over> <u16 size> <utf-8 error message>
+    I  <u32 count> (<u32 step> <u64 offset>) * count   keyframe index
+and a trailer <u64 offset of the I record> b"SNKI". Cells are row-major ids
+(y * size + x); NO_CELL marks a missing apple. A file cut short by a crash has
+no index and is scanned instead.
+"""
+import bisect
+import struct
+
+from game import Game
+
+MAGIC = b"SNKR"
+VERSION = 1
+TRAILER_MAGIC = b"SNKI"
+KEYFRAME_INTERVAL = 1024
+NO_CELL = 0xFFFFFFFF
+# Keyframes store cells as u16, which covers boards up to 256x256
+MAX_SIZE = 256
+
+HEADER = struct.Struct("<4sBHqI")  # magic, version, board size, seed, keyframe interval
+MOVES = struct.Struct("<H")
+MAX_MOVES = 0xFFFF
+APPLE = struct.Struct("<II")
+KEYFRAME = struct.Struct("<IIBII")
+END = struct.Struct("<IBH")
+INDEX_ENTRY = struct.Struct("<IQ")
+TRAILER = struct.Struct("<Q4s")
+
+
+def _pack_moves(moves):
+    packed = bytearray((len(moves) + 3) // 4)
+    for i, d in enumerate(moves):
+        packed[i >> 2] |= d << ((i & 3) * 2)
+    return packed
+
+
+def _unpack_moves(packed, count):
+    return [(packed[i >> 2] >> ((i & 3) * 2)) & 3 for i in range(count)]
+
+
+class ReplayWriter:
+    """
+    Streams one game to a replay file while it is played.
+    Memory stays bounded: at most one keyframe interval of moves is buffered.
+    """
+
+    def __init__(self, path, size, seed, keyframe_interval=KEYFRAME_INTERVAL):
+        if size > MAX_SIZE:
+            raise ValueError(f"Replays support boards up to {MAX_SIZE}x{MAX_SIZE}, not {size}x{size}")
+        self.file = open(path, "wb")
+        self.size = size
+        self.keyframe_interval = keyframe_interval
+        self.moves = bytearray()
+        self.index = []  # (step, offset) of every keyframe
+        self.file.write(HEADER.pack(MAGIC, VERSION, size, seed or 0, keyframe_interval))
+
+    def _cell(self, pos):
+        return NO_CELL if pos is None else pos[1] * self.size + pos[0]
+
+    def _flush_moves(self):
+        moves = self.moves
+        # An M record holds at most MAX_MOVES moves
+        for start in range(0, len(moves), MAX_MOVES):
+            chunk = moves[start : start + MAX_MOVES]
+            self.file.write(b"M" + MOVES.pack(len(chunk)) + _pack_moves(chunk))
+        moves.clear()
+
+    def keyframe(self, game):
+        self._flush_moves()
+        self.index.append((game.step_counter, self.file.tell()))
+        size = self.size
+        cells = [y * size + x for x, y in game.snake]
+        self.file.write(
+            b"K"
+            + KEYFRAME.pack(
+                game.step_counter, self._cell(game.apple), game.apple_eaten, game.grow_pending, len(cells)
+            )
+            + struct.pack(f"<{len(cells)}H", *cells)
+        )
+
+    def attach(self, game):
+        """Record every move and apple spawn of `game` from its current position on."""
+        self.keyframe(game)
+        move = game.move
+        move_many = game.move_many
+        spawn_apple = game._spawn_apple
+        moves = self.moves
+        interval = self.keyframe_interval
+
+        def recorded_move(direction):
+            step = game.step_counter
+            move(direction)
+            if game.step_counter != step:
+                moves.append(direction)
+                if game.step_counter % interval == 0:
+                    self.keyframe(game)
+
+        def recorded_move_many(directions):
+            # Split the batch at every multiple of the interval so its keyframe lands on that exact step
+            done = 0
+            while done < len(directions):
+                step = game.step_counter
+                chunk = directions[done : done + interval - step % interval]
+                try:
+                    applied = move_many(chunk)
+                finally:
+                    # Keep the moves made before a crash too
+                    moves.extend(chunk[: game.step_counter - step])
+                    if game.step_counter != step and game.step_counter % interval == 0:
+                        self.keyframe(game)
+                done += applied
+                if applied < len(chunk):
+                    break
+            return done
+
+        def recorded_spawn():
+            apple = spawn_apple()
+            self._flush_moves()
+            self.file.write(b"A" + APPLE.pack(game.step_counter, self._cell(apple)))
+            return apple
+
+        game.move = recorded_move
+        game.move_many = recorded_move_many
+        game._spawn_apple = recorded_spawn
+
+    def close(self, game, error=None):
+        """Finish the file with the final result (or the solver's crash) and the keyframe index."""
+        self._flush_moves()
+        message = (error or game.error_message or "").encode()
+        over = game.game_over or error is not None
+        self.file.write(b"E" + END.pack(game.step_counter, over, len(message)) + message)
+        index_offset = self.file.tell()
+        self.file.write(b"I" + struct.pack("<I", len(self.index)))
+        for step, offset in self.index:
+            self.file.write(INDEX_ENTRY.pack(step, offset))
+        self.file.write(TRAILER.pack(index_offset, TRAILER_MAGIC))
+        self.file.close()
+
+
+class ReplayReader:
+    """
+    Random access to a recorded game.
+    seek(step) restores the nearest keyframe at or before `step` and replays
+    from there, or keeps going from the current position when that is closer.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.data = f.read()
+        magic, version, self.size, self.seed, self.keyframe_interval = HEADER.unpack_from(self.data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} replay")
+        self.end = len(self.data)
+        self.final_step = None
+        self.game_over = False
+        self.error_message = None
+        if not self._read_index():
+            self._scan()
+        self.keyframe_steps = [step for step, _ in self.index]
+        # A recording attached mid-game (e.g. after --resume) starts at its first keyframe
+        self.start_step = self.keyframe_steps[0] if self.keyframe_steps else 0
+        self.game = Game(self.size)
+        self.offset = None  # offset of the next record after self.game's position
+        self.pending = []  # moves of a partly replayed M record
+
+    def _read_index(self):
+        data = self.data
+        if len(data) < HEADER.size + TRAILER.size:
+            return False
+        index_offset, magic = TRAILER.unpack_from(data, len(data) - TRAILER.size)
+        if magic != TRAILER_MAGIC or data[index_offset : index_offset + 1] != b"I":
+            return False
+        (count,) = struct.unpack_from("<I", data, index_offset + 1)
+        self.index = [INDEX_ENTRY.unpack_from(data, index_offset + 5 + i * INDEX_ENTRY.size) for i in range(count)]
+        self.end = index_offset
+        self._scan(self.index[-1][1] if self.index else HEADER.size, build_index=False)
+        return True
+
+    def _scan(self, offset=HEADER.size, build_index=True):
+        """Walk the records to find the keyframes (if unindexed) and the end of the game."""
+        if build_index:
+            self.index = []
+        data = self.data
+        step = 0
+        while offset < self.end:
+            kind = data[offset : offset + 1]
+            try:
+                next_offset = self._skip(offset)
+            except (struct.error, ValueError):
+                break
+            if next_offset > self.end:
+                # Truncated record from an interrupted run
+                break
+            if kind == b"K":
+                step = KEYFRAME.unpack_from(data, offset + 1)[0]
+                if build_index:
+                    self.index.append((step, offset))
+            elif kind == b"M":
+                step += MOVES.unpack_from(data, offset + 1)[0]
+            elif kind == b"E":
+                step, over, length = END.unpack_from(data, offset + 1)
+                self.game_over = bool(over)
+                start = offset + 1 + END.size
+                self.error_message = data[start : start + length].decode() or None
+            offset = next_offset
+        self.end = offset
+        self.final_step = step
+
+    def _skip(self, offset):
+        kind = self.data[offset : offset + 1]
+        if kind == b"M":
+            (count,) = MOVES.unpack_from(self.data, offset + 1)
+            return offset + 1 + MOVES.size + (count + 3) // 4
+        if kind == b"A":
+            return offset + 1 + APPLE.size
+        if kind == b"K":
+            length = KEYFRAME.unpack_from(self.data, offset + 1)[4]
+            return offset + 1 + KEYFRAME.size + 2 * length
+        if kind == b"E":
+            length = END.unpack_from(self.data, offset + 1)[2]
+            return offset + 1 + END.size + length
+        raise ValueError(f"Unknown replay record {kind!r} at {offset}")
+
+    def _pos(self, cell):
+        return None if cell == NO_CELL else (cell % self.size, cell // self.size)
+
+    def _restore(self, offset):
+        step, apple, eaten, grow_pending, length = KEYFRAME.unpack_from(self.data, offset + 1)
+        cells = struct.unpack_from(f"<{length}H", self.data, offset + 1 + KEYFRAME.size)
+        self.game.restore([self._pos(c) for c in cells], self._pos(apple), bool(eaten), grow_pending, step)
+        self.offset = self._skip(offset)
+        self.pending = []
+
+    def seek(self, step):
+        """Return the replay's Game positioned after `step` moves (clamped to the recording)."""
+        step = max(self.start_step, min(step, self.final_step))
+        game = self.game
+        if self.offset is None or step < game.step_counter or step - game.step_counter > self.keyframe_interval:
+            i = bisect.bisect_right(self.keyframe_steps, step) - 1
+            self._restore(self.index[i][1])
+        data = self.data
+        while game.step_counter < step:
+            if not self.pending:
+                if self.offset >= self.end:
+                    break
+                kind = data[self.offset : self.offset + 1]
+                if kind == b"A":
+                    game.apple = self._pos(APPLE.unpack_from(data, self.offset + 1)[1])
+                    game.apple_eaten = False
+                elif kind == b"M":
+                    (count,) = MOVES.unpack_from(data, self.offset + 1)
+                    start = self.offset + 1 + MOVES.size
+                    self.pending = _unpack_moves(data[start : start + (count + 3) // 4], count)
+                    self.pending.reverse()
+                self.offset = self._skip(self.offset)
+                continue
+            game.move(self.pending.pop())
+        # Apples spawned right after the last replayed move belong to this step
+        while not self.pending and self.offset < self.end and data[self.offset : self.offset + 1] in (b"A", b"K"):
+            if data[self.offset : self.offset + 1] == b"A":
+                game.apple = self._pos(APPLE.unpack_from(data, self.offset + 1)[1])
+                game.apple_eaten = False
+            self.offset = self._skip(self.offset)
+        return game
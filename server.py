@@ -0,0 +1,191 @@
+"""
+Game server for out-of-process solvers.
+Serves the solver API (move/measure/get_pos_x/get_pos_y/get_world_size) over a
+loopback TCP or Unix socket, one game.Game per connection, with the same rules
+as in-process play. A move batch is applied like Game.move_many and answered
+with a single reply, and a client may send any number of requests before
+reading the replies, which come back in request order:
+
+    python server.py --port 7777
+    python server.py --unix /tmp/snake.sock
+    python server.py --port 7777 --mirror --size 32   # also show the first 32x32 game in Tk
+
+Every request and reply is a frame <u8 op or status> <u32 payload length> <payload>:
+    NEW         <u16 size> <u8 has seed> <i64 seed>   -> <u16 size>
+    MOVES       <u8 direction> * n                    -> <u32 moves applied>
+    MEASURE                                           -> <i16 x> <i16 y>   (-1, -1 once the board is full)
+    POS                                               -> <u16 x> <u16 y>
+    WORLD_SIZE                                        -> <u16 size>
+    INFO                                              -> <u64 steps> <u32 length> <u8 game over>
+A request fails with GAME_OVER (the move that ended the game, or any later
+one) or ERROR, and the payload is then the UTF-8 error message. remote.py has
+a matching client.
+"""
+import argparse
+import asyncio
+import struct
+import sys
+
+from game import Game
+
+OP_NEW = 1
+OP_MOVES = 2
+OP_MEASURE = 3
+OP_POS = 4
+OP_WORLD_SIZE = 5
+OP_INFO = 6
+
+STATUS_OK = 0
+STATUS_GAME_OVER = 1
+STATUS_ERROR = 2
+
+FRAME = struct.Struct("<BI")
+NEW = struct.Struct("<HBq")
+APPLIED = struct.Struct("<I")
+POINT = struct.Struct("<hh")
+POS = struct.Struct("<HH")
+WORLD_SIZE = struct.Struct("<H")
+INFO = struct.Struct("<QIB")
+MAX_PAYLOAD = 1 << 24
+MAX_SIZE = 4096
+
+
+class Session:
+    """The game played over one connection; NEW replaces it."""
+
+    def __init__(self):
+        self.game = None
+
+    def handle(self, op, payload):
+        """Run one request and return (status, reply payload)."""
+        if op == OP_NEW:
+            if len(payload) != NEW.size:
+                return STATUS_ERROR, b"Malformed NEW request"
+            size, has_seed, seed = NEW.unpack(payload)
+            if size < 4 or size % 2 or size > MAX_SIZE:
+                return STATUS_ERROR, f"Board size must be even and in 4..{MAX_SIZE}, got {size}".encode()
+            self.game = Game(size, seed=seed if has_seed else None)
+            return STATUS_OK, WORLD_SIZE.pack(size)
+        game = self.game
+        if game is None:
+            return STATUS_ERROR, b"No game; send NEW first"
+        if op == OP_MOVES:
+            if game.game_over:
+                return STATUS_GAME_OVER, game.error_message.encode()
+            try:
+                applied = game.move_many(payload)
+            except RuntimeError as exc:
+                return STATUS_GAME_OVER, str(exc).encode()
+            return STATUS_OK, APPLIED.pack(applied)
+        if op == OP_MEASURE:
+            apple = game.measure()
+            return STATUS_OK, POINT.pack(*apple) if apple is not None else POINT.pack(-1, -1)
+        if op == OP_POS:
+            return STATUS_OK, POS.pack(game.get_pos_x(), game.get_pos_y())
+        if op == OP_WORLD_SIZE:
+            return STATUS_OK, WORLD_SIZE.pack(game.get_world_size())
+        if op == OP_INFO:
+            return STATUS_OK, INFO.pack(game.step_counter, game.length, game.game_over)
+        return STATUS_ERROR, f"Unknown op {op}".encode()
+
+
+class GameServer:
+    """asyncio server running one Session per connection."""
+
+    def __init__(self, mirror_size=None):
+        self.mirror_size = mirror_size
+        self.mirror = None  # Session currently shown in the UI
+        self.games_served = 0
+
+    async def serve_tcp(self, host, port):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+    async def serve_unix(self, path):
+        server = await asyncio.start_unix_server(self.handle_connection, path)
+        async with server:
+            await server.serve_forever()
+
+    async def handle_connection(self, reader, writer):
+        session = Session()
+        try:
+            while True:
+                try:
+                    op, length = FRAME.unpack(await reader.readexactly(FRAME.size))
+                except asyncio.IncompleteReadError:
+                    break
+                if length > MAX_PAYLOAD:
+                    message = f"Payload of {length} bytes exceeds {MAX_PAYLOAD}".encode()
+                    writer.write(FRAME.pack(STATUS_ERROR, len(message)) + message)
+                    break
+                payload = await reader.readexactly(length) if length else b""
+                if op == OP_NEW:
+                    self.games_served += 1
+                status, reply = self.run(session, op, payload)
+                writer.write(FRAME.pack(status, len(reply)) + reply)
+                # drain() only blocks once the client stops reading its pipelined replies
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if session is self.mirror:
+                self.mirror = None
+            writer.close()
+
+    def run(self, session, op, payload):
+        if self.mirror_size is None:
+            return session.handle(op, payload)
+        import app
+
+        with app.state_lock:
+            status, reply = session.handle(op, payload)
+            if op == OP_NEW and status == STATUS_OK and self.mirror in (None, session):
+                # The first game of the UI's board size is shown until its connection closes
+                if session.game.size == self.mirror_size:
+                    self.mirror = session
+                    app.game = session.game
+        if session is self.mirror and (session.game.game_over or app._frame_due()):
+            app._queue_state()
+        return status, reply
+
+
+def serve_with_mirror(server, serve):
+    """Run the server on a background thread while app.py's UI shows the mirrored game."""
+    import app
+
+    app.set_board_size(server.mirror_size)
+    app.headless_mode = False
+    app.step_wait_enabled = False
+    app.game = Game(server.mirror_size)
+    # Free-running frame decimation; the server never waits for the Right key
+    app.watch_running.set()
+    app.launch_ui(runner=lambda: asyncio.run(serve))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve snake games to out-of-process solvers.")
+    where = parser.add_mutually_exclusive_group()
+    where.add_argument("--port", type=int, default=7777, help="loopback TCP port (default 7777)")
+    where.add_argument("--unix", default=None, help="Unix socket path instead of TCP")
+    parser.add_argument("--host", default="127.0.0.1", help="TCP address to bind (default 127.0.0.1)")
+    parser.add_argument("--mirror", action="store_true", help="show the first game of --size in the Tk UI")
+    parser.add_argument("--size", type=int, default=32, help="board size of the mirrored game (default 32)")
+    args = parser.parse_args(argv)
+
+    server = GameServer(args.size if args.mirror else None)
+    serve = server.serve_unix(args.unix) if args.unix else server.serve_tcp(args.host, args.port)
+    print(f"Serving on {args.unix or f'{args.host}:{args.port}'}")
+    try:
+        if args.mirror:
+            serve_with_mirror(server, serve)
+        else:
+            asyncio.run(serve)
+    except KeyboardInterrupt:
+        pass
+    print(f"Served {server.games_served} games")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
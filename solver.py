@@ -1,3 +1,8 @@
+import hashlib
+import time
+from array import array
+from collections import OrderedDict, deque
+
 North = 0
 East = 1
 South = 2
@@ -7,67 +12,222 @@ FREE = 0
 FORBIDDEN = 1
 MUST = 2
 
-N = 32
-tail_pos = (0, 0)
-head_pos = (0, 0)
-body = []
-length = 1
-tree = None
-hamilton_cycle = None
-apple_pos = None
+# Keep following the current cycle while it reaches the apple within this many
+# moves of the Manhattan distance; otherwise re-plan
+REUSE_SLACK = 0
+# Node budget for the branch-and-bound path search run when no greedy variant reaches the apple
+SEARCH_RESCUE_BUDGET = 100000
+# Boards at least this wide play in large-board mode: one planned cycle followed
+# with shortcuts, instead of an O(n^2) re-plan every few moves
+LARGE_BOARD = 64
+# Large-board mode only takes shortcuts while the snake covers less than this share of the board.
+# This cap is the only thing keeping shortcuts safe and was found by measurement: with large-board
+# mode forced on 8x8, 0/500 seeds crash at 0.5, 2/500 at 0.7 and 41/500 at 1.0
+SHORTCUT_FILL = 0.5
+# Below large-board size, switch to following one frozen cycle once the snake covers this share of the board
+ENDGAME_FILL = 0.98
+# Memory cap of each solver's cache of built Hamiltonian cycles
+CYCLE_CACHE_BYTES = 4 << 20
 
-def moved_pos(pos, dir):
-    x, y = pos
-    if dir == North: return (x, y + 1)
-    if dir == East: return (x + 1, y)
-    if dir == South: return (x, y - 1)
-    if dir == West: return (x - 1, y)
-    raise ValueError("Invalid direction")
+DIR_VECS = ((0, 1), (1, 0), (0, -1), (-1, 0))
+
+VARIANT_PHASES = tuple(f"solver.calc_shortest_path.variant{v}" for v in range(8))
 
 def in_bounds(pos, n):
     x, y = pos
     return 0 <= x < n and 0 <= y < n
 
-def do_move(direction):
-    global tail_pos, head_pos, body, length
-    head_pos = moved_pos(head_pos, direction)
-    body.append(direction)
-    if length <= len(body):
-        first_dir = body.pop(0)
-        tail_pos = moved_pos(tail_pos, first_dir)
-    if head_pos == apple_pos:
-        length += 1
-    move(direction)
-
-def set_tree_restriction(tree_pos, dir, restriction):
-    global tree
-    opposite = moved_pos(tree_pos, dir)
-    assert {tree[tree_pos][dir], restriction} != {MUST, FORBIDDEN}
-    assert {tree[opposite][(dir+2)%4], restriction} != {MUST, FORBIDDEN}
-    tree[tree_pos][dir] = restriction
-    tree[opposite][(dir+2)%4] = restriction
-
-def calc_walk_restrictions(pos, dir):
-    nxt = moved_pos(pos, dir)
-    tree_cur = (pos[0] // 2, pos[1] // 2)
-    tree_nxt = (nxt[0] // 2, nxt[1] // 2)
-    if tree_cur == tree_nxt:
-        if in_bounds(moved_pos(tree_cur, (dir+3)%4), N//2):
-            set_tree_restriction(tree_cur, (dir+3)%4, FORBIDDEN)
-    else:
-        set_tree_restriction(tree_cur, dir, MUST)
+class Grid:
+    """
+    Lookup tables for an n x n board.
+    Cells are ids x * n + y, 2x2 tree blocks are ids bx * m + by (m = n // 2) and
+    the dual grid's vertices are ids px * (m + 1) + py. A tree edge is the slot
+    block * 4 + dir of a restriction array.
+    """
+
+    def __init__(self, n):
+        m = n // 2
+        self.n = n
+        self.m = m
+        self.cells = n * n
+        self.blocks = m * m
+        self.cell_x = [c // n for c in range(n * n)]
+        self.cell_y = [c % n for c in range(n * n)]
+        # Neighbor cell / block per (id, dir), -1 off the board
+        self.cell_nbr = [-1] * (n * n * 4)
+        for x in range(n):
+            for y in range(n):
+                for d, (dx, dy) in enumerate(DIR_VECS):
+                    if in_bounds((x + dx, y + dy), n):
+                        self.cell_nbr[(x * n + y) * 4 + d] = (x + dx) * n + y + dy
+        self.block_nbr = [-1] * (m * m * 4)
+        for bx in range(m):
+            for by in range(m):
+                for d, (dx, dy) in enumerate(DIR_VECS):
+                    if in_bounds((bx + dx, by + dy), m):
+                        self.block_nbr[(bx * m + by) * 4 + d] = (bx + dx) * m + by + dy
+        # In-bounds edge slots in (bx, by, dir) order, and the same edge seen from the other block
+        self.edge_slots = [s for s in range(m * m * 4) if self.block_nbr[s] >= 0]
+        self.opposite_slot = [-1] * (m * m * 4)
+        for s in self.edge_slots:
+            self.opposite_slot[s] = self.block_nbr[s] * 4 + (s % 4 + 2) % 4
+        self.empty_tree = bytes(FREE if self.block_nbr[s] >= 0 else FORBIDDEN for s in range(m * m * 4))
+        # Dual-grid edge crossed by each tree edge
+        self.dual_a = [0] * (m * m * 4)
+        self.dual_b = [0] * (m * m * 4)
+        for bx in range(m):
+            for by in range(m):
+                corners = (
+                    ((bx, by + 1), (bx + 1, by + 1)),
+                    ((bx + 1, by), (bx + 1, by + 1)),
+                    ((bx, by), (bx + 1, by)),
+                    ((bx, by), (bx, by + 1)),
+                )
+                for d, (a, b) in enumerate(corners):
+                    self.dual_a[(bx * m + by) * 4 + d] = a[0] * (m + 1) + a[1]
+                    self.dual_b[(bx * m + by) * 4 + d] = b[0] * (m + 1) + b[1]
+        # Tree edge constrained by walking (cell, dir): inside a block the edge on the
+        # walker's left must stay FORBIDDEN, across blocks the crossed edge is a MUST
+        self.walk_slot = [-1] * (n * n * 4)
+        self.walk_kind = bytearray(n * n * 4)
+        # Directions a head-to-apple path may take from each cell, and the two
+        # (slot, dir if MUST, dir otherwise) rules that give a cell's cycle neighbors
+        self.path_dirs = []
+        self.cycle_rules = []
+        rules = {
+            (0, 0): ((South, East), (West, North)),
+            (0, 1): ((North, East), (West, South)),
+            (1, 0): ((East, North), (South, West)),
+            (1, 1): ((East, South), (North, West)),
+        }
+        for c in range(n * n):
+            x, y = self.cell_x[c], self.cell_y[c]
+            block = (x // 2) * m + y // 2
+            for d in range(4):
+                nxt = self.cell_nbr[c * 4 + d]
+                if nxt < 0:
+                    continue
+                if self.cell_x[nxt] // 2 == x // 2 and self.cell_y[nxt] // 2 == y // 2:
+                    if self.block_nbr[block * 4 + (d + 3) % 4] >= 0:
+                        self.walk_slot[c * 4 + d] = block * 4 + (d + 3) % 4
+                        self.walk_kind[c * 4 + d] = FORBIDDEN
+                else:
+                    self.walk_slot[c * 4 + d] = block * 4 + d
+                    self.walk_kind[c * 4 + d] = MUST
+            self.path_dirs.append(tuple(
+                d for d in range(4)
+                if self.cell_nbr[c * 4 + d] >= 0 and d not in ([2, 0][x % 2], [1, 3][y % 2])
+            ))
+            (must1, else1), (must2, else2) = rules[(x % 2, y % 2)]
+            self.cycle_rules.append((block * 4 + must1, must1, else1, block * 4 + must2, must2, else2))
+
+    def cell(self, pos):
+        return pos[0] * self.n + pos[1]
+
+    def pos(self, cell):
+        return (self.cell_x[cell], self.cell_y[cell])
+
+    def distance(self, a, b):
+        return abs(self.cell_x[a] - self.cell_x[b]) + abs(self.cell_y[a] - self.cell_y[b])
+
+class Snapshot:
+    """
+    Immutable copy of one plan, published for readers on other threads.
+    `generation` increases with every re-plan, so readers can skip unchanged plans.
+    """
+
+    __slots__ = ("generation", "grid", "cycle", "tree")
+
+    def __init__(self, generation, grid, cycle, tree):
+        self.generation = generation
+        self.grid = grid
+        self.cycle = cycle
+        self.tree = tree
+
+    def cycle_dirs(self):
+        """Cycle as {(x, y): dir}."""
+        return {self.grid.pos(c): d for c, d in enumerate(self.cycle)}
+
+    def tree_dirs(self):
+        """Tree restrictions as {(bx, by): [restriction per dir]}."""
+        m = self.grid.m
+        tree = self.tree
+        return {(b // m, b % m): list(tree[b * 4:b * 4 + 4]) for b in range(self.grid.blocks)}
+
+class CycleCache:
+    """
+    Bounded LRU of built Hamiltonian cycles keyed by a digest of their tree.
+    Re-plans often end in the same spanning tree as the one before, and a hit
+    then costs a hash lookup instead of a walk over every cell. Entries are
+    evicted oldest-first once their cycles and indices exceed max_bytes.
+    """
+
+    def __init__(self, max_bytes=CYCLE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # digest -> (cycle, cycle index)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(tree):
+        return hashlib.blake2b(tree, digest_size=16).digest()
+
+    @staticmethod
+    def entry_bytes(cycle, cycle_index):
+        return len(cycle) + len(cycle_index) * cycle_index.itemsize
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, cycle, cycle_index):
+        size = self.entry_bytes(cycle, cycle_index)
+        if size > self.max_bytes:
+            return
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.bytes -= self.entry_bytes(*old)
+        self.entries[key] = (cycle, cycle_index)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, old = self.entries.popitem(last=False)
+            self.bytes -= self.entry_bytes(*old)
+            self.evictions += 1
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
 
 class UnionFind:
+    """
+    Union by size without path compression, so every union can be undone.
+    mark() returns a point in the union history and rollback() reverts to it,
+    costing only the unions made since.
+    """
+
     def __init__(self, n):
         self.parent = list(range(n))
         self.size = [1] * n
+        self.history = []
 
     def find(self, u):
-        if self.parent[u] == u:
-            return u
-        self.parent[u] = self.find(self.parent[u])
-        return self.parent[u]
-    
+        parent = self.parent
+        while parent[u] != u:
+            u = parent[u]
+        return u
+
     def same(self, u, v):
         return self.find(u) == self.find(v)
 
@@ -79,176 +239,693 @@ class UnionFind:
                 root_u, root_v = root_v, root_u
             self.parent[root_v] = root_u
             self.size[root_u] += self.size[root_v]
+            self.history.append(root_v)
 
-    def copy(self):
-        new_uf = UnionFind(0)
-        new_uf.parent = self.parent[:]
-        new_uf.size = self.size[:]
-        return new_uf
-
-def distance(a, b):
-    return abs(a[0]-b[0]) + abs(a[1]-b[1])
-
-def calc_shortest_path():
-    global tree
-    cur_pos = tail_pos
-    restrict = False
-    for i, body_dir in enumerate(body):
-        if distance(head_pos, cur_pos) <= i + 2 or restrict:
-            calc_walk_restrictions(cur_pos, body_dir)
-            restrict = True
-        cur_pos = moved_pos(cur_pos, body_dir)
-    edges = [((i, j), d) for i in range(N//2) for j in range(N//2) for d in range(4) if in_bounds(moved_pos((i, j), d), N//2)]
-    uf = UnionFind((N//2) * (N//2))
-    inv_uf = UnionFind((N//2+1) * (N//2+1))
-    for i in range(N//2):
-        inv_uf.union(i*(N//2+1)+0, (i+1)*(N//2+1)+0)
-        inv_uf.union(i*(N//2+1)+(N//2), (i+1)*(N//2+1)+(N//2))
-        inv_uf.union(0*(N//2+1)+i, 0*(N//2+1)+(i+1))
-        inv_uf.union((N//2)*(N//2+1)+i, (N//2)*(N//2+1)+(i+1))
-    def calc_inv_pos(pos, dir):
-        if dir == North:
-            return ((pos[0], pos[1]+1), (pos[0]+1, pos[1]+1))
-        if dir == East:
-            return ((pos[0]+1, pos[1]), (pos[0]+1, pos[1]+1))
-        if dir == South:
-            return ((pos[0], pos[1]), (pos[0]+1, pos[1]))
-        if dir == West:
-            return ((pos[0], pos[1]), (pos[0], pos[1]+1))
-    for pos, dir in edges:
-        if tree[pos][dir] == MUST:
-            nxt = moved_pos(pos, dir)
-            uf.union(pos[0]*(N//2)+pos[1], nxt[0]*(N//2)+nxt[1])
-        if tree[pos][dir] == FORBIDDEN:
-            pos, nxt = calc_inv_pos(pos, dir)
-            inv_uf.union(pos[0]*(N//2+1)+pos[1], nxt[0]*(N//2+1)+nxt[1])
-    initial_uf = uf.copy()
-    initial_inv_uf = inv_uf.copy()
-    intial_tree = {k: v[:] for k, v in tree.items()}
-    def undo_to_initial():
-        global tree
-        nonlocal uf, inv_uf
-        uf = initial_uf.copy()
-        inv_uf = initial_inv_uf.copy()
-        tree = {k: v[:] for k, v in intial_tree.items()}
-    def set_tree_restriction(tree_pos, dir, restriction):
-        opposite = moved_pos(tree_pos, dir)
-        tree[tree_pos][dir] = restriction
-        tree[opposite][(dir+2)%4] = restriction
-    def can_move(pos, dir):
-        nxt = moved_pos(pos, dir)
-        tree_cur = (pos[0] // 2, pos[1] // 2)
-        tree_nxt = (nxt[0] // 2, nxt[1] // 2)
-        if tree_cur == tree_nxt:
-            if in_bounds(moved_pos(tree_cur, (dir+3)%4), N//2):
-                a, b = calc_inv_pos(tree_cur, (dir+3)%4)
-                return not (tree[tree_cur][(dir+3)%4] != FORBIDDEN and inv_uf.same(a[0]*(N//2+1)+a[1], b[0]*(N//2+1)+b[1])) and tree[tree_cur][(dir+3)%4] != MUST
-            return True
-        else:
-            a, b = tree_cur, moved_pos(tree_cur, dir)
-            return not (tree[tree_cur][dir] != MUST and uf.same(a[0]*(N//2)+a[1], b[0]*(N//2)+b[1])) and tree[tree_cur][dir] != FORBIDDEN
-    def update_tree(pos, dir):
-        nxt = moved_pos(pos, dir)
-        tree_cur = (pos[0] // 2, pos[1] // 2)
-        tree_nxt = (nxt[0] // 2, nxt[1] // 2)
-        if tree_cur == tree_nxt:
-            if in_bounds(moved_pos(tree_cur, (dir+3)%4), N//2):
-                a, b = calc_inv_pos(tree_cur, (dir+3)%4)
-                inv_uf.union(a[0]*(N//2+1)+a[1], b[0]*(N//2+1)+b[1])
-                set_tree_restriction(tree_cur, (dir+3)%4, FORBIDDEN)
+    def mark(self):
+        return len(self.history)
+
+    def rollback(self, mark):
+        parent, size, history = self.parent, self.size, self.history
+        while len(history) > mark:
+            root_v = history.pop()
+            size[parent[root_v]] -= size[root_v]
+            parent[root_v] = root_v
+
+class FixedReplan:
+    """
+    Re-plan policy: follow a fresh path for `every` moves when it is at least
+    `min_path` long and to the apple otherwise. This is the default.
+    A policy's segment() gets every path plan() returns and says how many of
+    its moves to make before planning again; planned() follows every full
+    re-plan (path search, tree and cycle) with its duration, and
+    solver.plan_work holds its machine-independent cost. get_state() and
+    set_state() carry its settings and learned state through a checkpoint.
+    """
+
+    def __init__(self, every=16, min_path=120):
+        self.every = every
+        self.min_path = min_path
+
+    def get_state(self):
+        return {"every": self.every, "min_path": self.min_path}
+
+    def set_state(self, state):
+        self.every = state["every"]
+        self.min_path = state["min_path"]
+
+    def segment(self, solver, path, replanned):
+        if replanned and len(path) >= self.min_path:
+            return self.every
+        return len(path)
+
+    def planned(self, solver, seconds):
+        pass
+
+class AdaptiveReplan:
+    """
+    Re-plan policy driven by the moves re-planning saves. A path no longer
+    than the distance to the apple cannot improve and is followed to the end;
+    a detour is re-planned after `every` moves, once the tail has freed cells
+    it might be able to cut through. After each mid-path re-plan, `every`
+    shrinks if the new path saved moves over the rest of the old one and
+    grows if it saved none.
+    """
+
+    def __init__(self, every=16, min_every=2, max_every=32):
+        self.every = every
+        self.min_every = min_every
+        self.max_every = max_every
+        self.cut = None  # (apple, moves left on the path) when the last segment stopped short of the apple
+
+    def get_state(self):
+        return {"every": self.every, "min_every": self.min_every, "max_every": self.max_every, "cut": self.cut}
+
+    def set_state(self, state):
+        self.every = state["every"]
+        self.min_every = state["min_every"]
+        self.max_every = state["max_every"]
+        self.cut = tuple(state["cut"]) if state["cut"] is not None else None
+
+    def segment(self, solver, path, replanned):
+        cut = self.cut
+        if cut is not None and cut[0] == solver.apple_pos:
+            if cut[1] - len(path) > 0:
+                self.every = max(self.min_every, self.every // 2)
+            else:
+                self.every = min(self.max_every, self.every * 2)
+        self.cut = None
+        detour = len(path) - solver.grid.distance(solver.head_pos, solver.apple_pos)
+        if not detour or len(path) <= self.every:
+            return len(path)
+        self.cut = (solver.apple_pos, len(path) - self.every)
+        return self.every
+
+    def planned(self, solver, seconds):
+        pass
+
+class BudgetReplan:
+    """
+    Re-plan policy that spends about `work_per_move` units of planning work per
+    move: a path with a detour is re-planned after as many moves as the
+    average full re-plan buys at that rate. Work is Solver.plan_work, counted
+    rather than timed, so a seed plays the same moves on any machine; at 32x32
+    one unit is about 2.3 us.
+    """
+
+    def __init__(self, work_per_move=50):
+        self.work_per_move = work_per_move
+        self.plan_work = None  # moving average of Solver.plan_work over full re-plans
+
+    def get_state(self):
+        return {"work_per_move": self.work_per_move, "plan_work": self.plan_work}
+
+    def set_state(self, state):
+        self.work_per_move = state["work_per_move"]
+        self.plan_work = state["plan_work"]
+
+    def segment(self, solver, path, replanned):
+        detour = len(path) - solver.grid.distance(solver.head_pos, solver.apple_pos)
+        if not detour or self.plan_work is None:
+            return len(path)
+        return min(len(path), max(1, round(self.plan_work / self.work_per_move)))
+
+    def planned(self, solver, seconds):
+        if self.plan_work is None:
+            self.plan_work = solver.plan_work
         else:
-            a, b = tree_cur, moved_pos(tree_cur, dir)
-            uf.union(a[0]*(N//2)+a[1], b[0]*(N//2)+b[1])
-            set_tree_restriction(tree_cur, dir, MUST)
+            self.plan_work += (solver.plan_work - self.plan_work) * 0.1
+
+REPLAN_POLICIES = {"fixed": FixedReplan, "adaptive": AdaptiveReplan, "budget": BudgetReplan}
+
+class Solver:
+    """
+    Hamiltonian-cycle snake solver bound to one game.
+    `game` provides move(direction) and measure(); call run() to play the whole
+    game, or plan()/step() to drive it one re-plan or one move at a time.
+    Positions are Grid cell ids; the tree is a bytearray of edge restrictions
+    and the cycle a bytearray holding each cell's outgoing direction.
+    """
+
+    # profiling.Profiler receiving per-variant timings, set while profiling is enabled
+    profiler = None
+
+    def __init__(self, game, cycle_cache=None, replan=None):
+        self.game = game
+        self.grid = Grid(game.get_world_size())
+        self.tail_pos = 0
+        self.head_pos = 0
+        self.body = deque()
+        self.length = 1
+        self.tree = bytearray(self.grid.empty_tree)
+        self.hamilton_cycle = None
+        self.cycle_index = None
+        # Pass one CycleCache to several solvers to share cycles between games
+        self.cycle_cache = cycle_cache if cycle_cache is not None else CycleCache()
+        self.apple_pos = None
+        self.segment_left = 0
+        self.reuse_slack = REUSE_SLACK
+        # When to re-plan mid-path; see FixedReplan for the interface
+        self.replan = replan if replan is not None else FixedReplan()
+        self.replans = 0
+        self.replan_seconds = 0.0
+        # Plans are counted always but only copied out for a UI that asked for them
+        self.generation = 0
+        self.publish_snapshots = False
+        self.snapshot = None
+        self.search_nodes = 0
+        self.path_steps = 0  # cells visited by the greedy variants
+        self.plan_work = None  # deterministic cost of the last full re-plan, see plan()
+        self.large_board = self.grid.n >= LARGE_BOARD
+        self.cycle_order = None  # frozen cycle's directions in cycle order (large-board mode)
+        self.checkpointer = None  # checkpoint.Checkpointer ticked between batches of moves
+
+    @property
+    def done(self):
+        return self.length >= self.grid.cells
+
+    def get_state(self):
+        """The solver's copy of the snake and its current plan, for checkpoint.py."""
+        return {
+            "head_pos": self.head_pos,
+            "tail_pos": self.tail_pos,
+            "body": bytes(self.body),
+            "length": self.length,
+            "apple_pos": self.apple_pos,
+            "tree": bytes(self.tree),
+            "hamilton_cycle": bytes(self.hamilton_cycle) if self.hamilton_cycle is not None else None,
+            "segment_left": self.segment_left,
+            "generation": self.generation,
+            "frozen": self.cycle_order is not None,
+            "replan": self.replan_state(),
+        }
+
+    def replan_state(self):
+        """The re-plan policy's name and state, or None for a policy outside REPLAN_POLICIES."""
+        for name, policy in REPLAN_POLICIES.items():
+            if type(self.replan) is policy:
+                return {"policy": name, "state": self.replan.get_state()}
+        return None
+
+    def set_state(self, state):
+        self.head_pos = state["head_pos"]
+        self.tail_pos = state["tail_pos"]
+        self.body = deque(state["body"])
+        self.length = state["length"]
+        self.apple_pos = state["apple_pos"]
+        self.tree = bytearray(state["tree"])
+        self.segment_left = state["segment_left"]
+        self.generation = state["generation"]
+        replan = state.get("replan")
+        if replan is not None:
+            # Resume with the policy the checkpoint was taken with
+            self.replan = REPLAN_POLICIES[replan["policy"]]()
+            self.replan.set_state(replan["state"])
+        if state["hamilton_cycle"] is None:
+            return
+        # The cycle index counts from cell 0, as calc_hamilton_cycle does
+        cycle = bytearray(state["hamilton_cycle"])
+        cell_nbr = self.grid.cell_nbr
+        cycle_index = array("I", bytes(4 * self.grid.cells))
+        pos = 0
+        for k in range(self.grid.cells):
+            cycle_index[pos] = k
+            pos = cell_nbr[pos * 4 + cycle[pos]]
+        self.hamilton_cycle = cycle
+        self.cycle_index = cycle_index
+        if state["frozen"]:
+            self.freeze_cycle()
+        if self.publish_snapshots:
+            self.snapshot = Snapshot(self.generation, self.grid, bytes(cycle), bytes(self.tree))
+
+    def track_move(self, direction):
+        """Update the solver's copy of the snake for one move."""
+        cell_nbr = self.grid.cell_nbr
+        self.head_pos = cell_nbr[self.head_pos * 4 + direction]
+        self.body.append(direction)
+        if self.length <= len(self.body):
+            first_dir = self.body.popleft()
+            self.tail_pos = cell_nbr[self.tail_pos * 4 + first_dir]
+        if self.head_pos == self.apple_pos:
+            self.length += 1
 
-    best_path = None
-    for v in range(8):
+    def track_moves(self, directions):
+        """track_move for a batch of moves that reaches the apple at most on its last move."""
+        cell_nbr = self.grid.cell_nbr
+        head = self.head_pos
+        for d in directions:
+            head = cell_nbr[head * 4 + d]
+        self.head_pos = head
+        body = self.body
+        body.extend(directions)
+        tail = self.tail_pos
+        for _ in range(len(body) - self.length + 1):
+            tail = cell_nbr[tail * 4 + body.popleft()]
+        self.tail_pos = tail
+        if head == self.apple_pos:
+            self.length += 1
+
+    def do_move(self, direction):
+        self.track_move(direction)
+        self.game.move(direction)
+
+    def set_tree_restriction(self, slot, restriction):
+        tree = self.tree
+        opposite = self.grid.opposite_slot[slot]
+        # MUST + FORBIDDEN is the only pair summing to 3
+        assert tree[slot] + restriction != MUST + FORBIDDEN
+        assert tree[opposite] + restriction != MUST + FORBIDDEN
+        tree[slot] = restriction
+        tree[opposite] = restriction
+
+    def calc_walk_restrictions(self, pos, dir):
+        slot = self.grid.walk_slot[pos * 4 + dir]
+        if slot >= 0:
+            self.set_tree_restriction(slot, self.grid.walk_kind[pos * 4 + dir])
+
+    def calc_shortest_path(self):
+        grid = self.grid
+        m = grid.m
+        cell_nbr, block_nbr = grid.cell_nbr, grid.block_nbr
+        opposite_slot, dual_a, dual_b = grid.opposite_slot, grid.dual_a, grid.dual_b
+        walk_slot, walk_kind = grid.walk_slot, grid.walk_kind
+        cell_x, cell_y = grid.cell_x, grid.cell_y
+        head_pos, apple_pos = self.head_pos, self.apple_pos
+        cur_pos = self.tail_pos
+        restrict = False
+        for i, body_dir in enumerate(self.body):
+            if restrict or grid.distance(head_pos, cur_pos) <= i + 2:
+                self.calc_walk_restrictions(cur_pos, body_dir)
+                restrict = True
+            cur_pos = cell_nbr[cur_pos * 4 + body_dir]
+        tree = self.tree
+        uf = UnionFind(m * m)
+        inv_uf = UnionFind((m+1) * (m+1))
+        for i in range(m):
+            inv_uf.union(i*(m+1)+0, (i+1)*(m+1)+0)
+            inv_uf.union(i*(m+1)+m, (i+1)*(m+1)+m)
+            inv_uf.union(0*(m+1)+i, 0*(m+1)+(i+1))
+            inv_uf.union(m*(m+1)+i, m*(m+1)+(i+1))
+        for slot in grid.edge_slots:
+            if tree[slot] == MUST:
+                uf.union(slot >> 2, block_nbr[slot])
+            if tree[slot] == FORBIDDEN:
+                inv_uf.union(dual_a[slot], dual_b[slot])
+        # Each variant journals its unions and tree writes, so undoing it costs only what it touched
+        uf_mark = uf.mark()
+        inv_uf_mark = inv_uf.mark()
+        tree_log = []
+        def undo_to(marks):
+            uf.rollback(marks[0])
+            inv_uf.rollback(marks[1])
+            for slot, restriction in reversed(tree_log[marks[2]:]):
+                tree[slot] = restriction
+            del tree_log[marks[2]:]
+        def undo_to_initial():
+            undo_to((uf_mark, inv_uf_mark, 0))
+        def can_move(pos, dir):
+            slot = walk_slot[pos * 4 + dir]
+            if slot < 0:
+                return True
+            if walk_kind[pos * 4 + dir] == FORBIDDEN:
+                return not (tree[slot] != FORBIDDEN and inv_uf.same(dual_a[slot], dual_b[slot])) and tree[slot] != MUST
+            return not (tree[slot] != MUST and uf.same(slot >> 2, block_nbr[slot])) and tree[slot] != FORBIDDEN
+        def update_tree(pos, dir):
+            slot = walk_slot[pos * 4 + dir]
+            if slot < 0:
+                return
+            opposite = opposite_slot[slot]
+            tree_log.append((slot, tree[slot]))
+            tree_log.append((opposite, tree[opposite]))
+            if walk_kind[pos * 4 + dir] == FORBIDDEN:
+                inv_uf.union(dual_a[slot], dual_b[slot])
+                tree[slot] = tree[opposite] = FORBIDDEN
+            else:
+                uf.union(slot >> 2, block_nbr[slot])
+                tree[slot] = tree[opposite] = MUST
+
+        ax, ay = cell_x[apple_pos], cell_y[apple_pos]
+        profiler = self.profiler
+        best_path = None
+        for v in range(8):
+            if profiler is not None:
+                phase_start = time.perf_counter()
+            pos = head_pos
+            path_dirs = []
+            # A variant that gets stuck or walks back into its own path can never lie on the cycle
+            visited = bytearray(grid.cells)
+            visited[pos] = 1
+            while pos != apple_pos and (best_path is None or len(path_dirs) <= len(best_path)):
+                x, y = cell_x[pos], cell_y[pos]
+                cand_ds = []
+                for d in grid.path_dirs[pos]:
+                    next_pos = cell_nbr[pos * 4 + d]
+                    dist_diff = abs(cell_x[next_pos] - ax) + abs(cell_y[next_pos] - ay) - abs(x - ax) - abs(y - ay)
+                    cand_ds.append((dist_diff, (v%4+[d, -d][v//4])%4, d))
+                for _, _, d in sorted(cand_ds):
+                    if can_move(pos, d):
+                        path_dirs.append(d)
+                        update_tree(pos, d)
+                        pos = cell_nbr[pos * 4 + d]
+                        break
+                else:
+                    path_dirs = None
+                    break
+                if visited[pos]:
+                    path_dirs = None
+                    break
+                visited[pos] = 1
+            self.path_steps += visited.count(1)
+            undo_to_initial()
+            if path_dirs is not None and (best_path is None or len(path_dirs) < len(best_path)):
+                best_path = path_dirs
+            if profiler is not None:
+                profiler.record(VARIANT_PHASES[v], time.perf_counter() - phase_start)
+
+        # Branch and bound over the same moves and constraints rescues plans
+        # where every greedy variant got stuck or ran in circles
+        if best_path is None:
+            if profiler is not None:
+                phase_start = time.perf_counter()
+            budget = SEARCH_RESCUE_BUDGET
+            limit = grid.cells
+            def ordered_moves(pos):
+                moves = grid.path_dirs[pos]
+                if len(moves) == 2 and grid.distance(cell_nbr[pos * 4 + moves[1]], apple_pos) < grid.distance(cell_nbr[pos * 4 + moves[0]], apple_pos):
+                    return (moves[1], moves[0])
+                return moves
+            visited = bytearray(grid.cells)
+            visited[head_pos] = 1
+            path_dirs = []
+            # Frame: [cell, candidate moves, next candidate, undo marks of the move into cell]
+            frames = [[head_pos, ordered_moves(head_pos), 0, None]]
+            nodes = 0
+            while frames and nodes < budget:
+                frame = frames[-1]
+                pos, moves, i, marks = frame
+                if i == len(moves):
+                    frames.pop()
+                    if marks is not None:
+                        undo_to(marks)
+                        visited[pos] = 0
+                        path_dirs.pop()
+                    continue
+                frame[2] += 1
+                d = moves[i]
+                nxt = cell_nbr[pos * 4 + d]
+                if visited[nxt] or len(path_dirs) + 1 + grid.distance(nxt, apple_pos) >= limit:
+                    continue
+                if not can_move(pos, d):
+                    continue
+                nodes += 1
+                marks = (uf.mark(), inv_uf.mark(), len(tree_log))
+                update_tree(pos, d)
+                path_dirs.append(d)
+                if nxt == apple_pos:
+                    best_path = path_dirs[:]
+                    limit = len(best_path)
+                    undo_to(marks)
+                    path_dirs.pop()
+                    continue
+                visited[nxt] = 1
+                frames.append([nxt, ordered_moves(nxt), 0, marks])
+            self.search_nodes += nodes
+            undo_to_initial()
+            if profiler is not None:
+                profiler.record("solver.calc_shortest_path.search", time.perf_counter() - phase_start)
+        if best_path is None:
+            return None
         pos = head_pos
-        path_dirs = []
-        while pos != apple_pos and (best_path is None or len(path_dirs) <= len(best_path)):
-            cand_ds = []
+        for d in best_path:
+            update_tree(pos, d)
+            pos = cell_nbr[pos * 4 + d]
+        return best_path
+
+    def fill_spanning_tree(self):
+        """
+        Complete the tree greedily in edge_slots order.
+        The head-to-apple path is already fixed by the walk restrictions, so the
+        completion only shapes the cycle beyond the apple; keeping the best of
+        four completions gave the same 66116-move game on 32x32 seed 1 in 43%
+        more time.
+        """
+        tree = self.tree
+        block_nbr = self.grid.block_nbr
+        uf = UnionFind(self.grid.blocks)
+        for slot in self.grid.edge_slots:
+            if tree[slot] == MUST:
+                uf.union(slot >> 2, block_nbr[slot])
+        for slot in self.grid.edge_slots:
+            if tree[slot] != FREE:
+                continue
+            if uf.find(slot >> 2) != uf.find(block_nbr[slot]):
+                self.set_tree_restriction(slot, MUST)
+                uf.union(slot >> 2, block_nbr[slot])
+        for slot in self.grid.edge_slots:
+            if tree[slot] == FREE:
+                self.set_tree_restriction(slot, FORBIDDEN)
+
+    def calc_hamilton_cycle(self):
+        tree = self.tree
+        key = self.cycle_cache.key(tree)
+        cached = self.cycle_cache.get(key)
+        if cached is not None:
+            self.hamilton_cycle, self.cycle_index = cached
+            return
+        grid = self.grid
+        cell_nbr, cycle_rules = grid.cell_nbr, grid.cycle_rules
+        hamilton_cycle = bytearray(grid.cells)
+        cycle_index = [0] * grid.cells
+        pos = 0
+        prev_dir = West
+        for k in range(grid.cells):
+            slot1, must1, else1, slot2, must2, else2 = cycle_rules[pos]
+            next_dir = must1 if tree[slot1] == MUST else else1
+            if next_dir == (prev_dir + 2) % 4:
+                next_dir = must2 if tree[slot2] == MUST else else2
+            hamilton_cycle[pos] = next_dir
+            cycle_index[pos] = k
+            pos = cell_nbr[pos * 4 + next_dir]
+            prev_dir = next_dir
+        self.hamilton_cycle = hamilton_cycle
+        self.cycle_index = array("I", cycle_index)
+        self.cycle_cache.put(key, hamilton_cycle, self.cycle_index)
+
+    def publish(self):
+        """Stamp a new plan; copy it into an immutable Snapshot only if someone is watching."""
+        self.generation += 1
+        if self.publish_snapshots:
+            self.snapshot = Snapshot(self.generation, self.grid, bytes(self.hamilton_cycle), bytes(self.tree))
+
+    def cycle_path_to_apple(self):
+        """
+        Return the current cycle's path from head to apple if it is within the
+        reuse bound and the body clears out of its way in time, else None.
+        """
+        if not self.cycle_index:
+            return None
+        grid = self.grid
+        head_pos, apple_pos = self.head_pos, self.apple_pos
+        steps = (self.cycle_index[apple_pos] - self.cycle_index[head_pos]) % grid.cells
+        if steps > grid.distance(head_pos, apple_pos) + self.reuse_slack:
+            return None
+        # Body cell i (0 = tail) is vacated by the (i + 1 + pending)-th move
+        cell_nbr = grid.cell_nbr
+        pending = self.length - 1 - len(self.body)
+        body_index = {}
+        pos = self.tail_pos
+        for i, body_dir in enumerate(self.body):
+            body_index[pos] = i
+            pos = cell_nbr[pos * 4 + body_dir]
+        body_index[pos] = len(self.body)
+        path = []
+        pos = head_pos
+        for t in range(1, steps + 1):
+            d = self.hamilton_cycle[pos]
+            pos = cell_nbr[pos * 4 + d]
+            if body_index.get(pos, -1) >= t - pending:
+                return None
+            path.append(d)
+        return path
+
+    def cycle_step_is_safe(self):
+        """Whether the next move along the current cycle avoids the body."""
+        if self.hamilton_cycle is None:
+            return False
+        cell_nbr = self.grid.cell_nbr
+        nxt = cell_nbr[self.head_pos * 4 + self.hamilton_cycle[self.head_pos]]
+        if nxt == self.tail_pos:
+            # The tail only vacates when no growth is pending and we do not eat
+            return self.length - 1 == len(self.body) and nxt != self.apple_pos
+        pos = self.tail_pos
+        for body_dir in self.body:
+            pos = cell_nbr[pos * 4 + body_dir]
+            if pos == nxt:
+                return False
+        return True
+
+    def plan(self):
+        """Pick the cycle to follow towards the current apple; returns the head-to-apple path."""
+        if self.apple_pos is None or self.head_pos == self.apple_pos:
+            self.apple_pos = self.grid.cell(self.game.measure())
+        apple_path = self.cycle_path_to_apple()
+        if apple_path is not None:
+            self.segment_left = self.replan.segment(self, apple_path, False)
+            return apple_path
+        start = time.perf_counter()
+        work = self.path_steps + self.search_nodes
+        self.tree[:] = self.grid.empty_tree
+        apple_path = self.calc_shortest_path()
+        if apple_path is None:
+            # Nothing fits the body's restrictions yet: take one more step on the
+            # old cycle if that is safe, and re-plan once the tail has moved on
+            if not self.cycle_step_is_safe():
+                grid = self.grid
+                raise RuntimeError(f"No feasible path from {grid.pos(self.head_pos)} to {grid.pos(self.apple_pos)}")
+            self.segment_left = 1
+            return []
+        self.fill_spanning_tree()
+        self.calc_hamilton_cycle()
+        self.publish()
+        seconds = time.perf_counter() - start
+        # Cells the variants walked and the search expanded, plus one pass over the board for tree and cycle
+        self.plan_work = self.path_steps + self.search_nodes - work + self.grid.cells
+        self.replans += 1
+        self.replan_seconds += seconds
+        self.replan.planned(self, seconds)
+        self.segment_left = self.replan.segment(self, apple_path, True)
+        return apple_path
+
+    def step(self):
+        """Make one move along the cycle, re-planning first when the segment is used up."""
+        if self.segment_left <= 0 or self.head_pos == self.apple_pos:
+            self.plan()
+        self.segment_left -= 1
+        self.do_move(self.hamilton_cycle[self.head_pos])
+
+    def advance(self):
+        """Play the rest of the current segment (up to the apple) in one move_many call."""
+        if self.cycle_order is not None:
+            self.follow_frozen()
+            return
+        if self.segment_left <= 0 or self.head_pos == self.apple_pos:
+            if self.length >= self.grid.cells * ENDGAME_FILL and self.body_follows_cycle():
+                # Endgame: the tree is almost all forced by now, so keep this cycle for good
+                self.freeze_cycle()
+                self.follow_frozen()
+                return
+            self.plan()
+        cycle = self.hamilton_cycle
+        cell_nbr = self.grid.cell_nbr
+        apple_pos = self.apple_pos
+        pos = self.head_pos
+        directions = []
+        for _ in range(self.segment_left):
+            d = cycle[pos]
+            directions.append(d)
+            pos = cell_nbr[pos * 4 + d]
+            if pos == apple_pos:
+                break
+        applied = self.game.move_many(directions)
+        self.track_moves(directions[:applied])
+        self.segment_left -= applied
+
+    def body_follows_cycle(self):
+        """Whether the body lies on the current cycle from tail to head, so the cycle can be frozen."""
+        cycle = self.hamilton_cycle
+        cell_nbr = self.grid.cell_nbr
+        pos = self.tail_pos
+        for d in self.body:
+            if cycle[pos] != d:
+                return False
+            pos = cell_nbr[pos * 4 + d]
+        return True
+
+    def freeze_cycle(self):
+        """Lay the current cycle out in cycle order so runs along it are slices."""
+        order = bytearray(self.grid.cells)
+        for cell, k in enumerate(self.cycle_index):
+            order[k] = self.hamilton_cycle[cell]
+        self.cycle_order = bytes(order)
+
+    def cycle_run(self):
+        """Directions along the frozen cycle from the head to the apple."""
+        i = self.cycle_index[self.head_pos]
+        j = self.cycle_index[self.apple_pos]
+        order = self.cycle_order
+        return order[i:j] if i <= j else order[i:] + order[:j]
+
+    def shortcut_path(self):
+        """
+        Directions from the head to the apple on the frozen cycle, jumping ahead
+        along it. The body always lies in cycle order between tail and head, so
+        every cell ahead of the head and short of the tail is free; a jump may
+        not pass the apple and must leave more free cells before the tail than
+        the snake grows on this path. That is not a safety invariant: cells
+        skipped behind the head stay free until the tail passes them, and later
+        apples can still pin the head against the tail. Only SHORTCUT_FILL
+        keeps these paths safe.
+        """
+        grid = self.grid
+        cells = grid.cells
+        cell_nbr = grid.cell_nbr
+        cycle = self.hamilton_cycle
+        index = self.cycle_index
+        head, tail, apple = self.head_pos, self.tail_pos, self.apple_pos
+        apple_index = index[apple]
+        pending = self.length - 1 - len(self.body)
+        # The tail walks the current body, then the moves planned here
+        body_dirs = iter(self.body)
+        path = []
+        planned = 0
+        while head != apple:
+            head_index = index[head]
+            to_tail = (index[tail] - head_index) % cells
+            to_apple = (apple_index - head_index) % cells
+            limit = to_apple if to_apple < to_tail else to_tail - 1
+            best_dir, best = cycle[head], 1
             for d in range(4):
-                next_pos = moved_pos(pos, d)
-                if not in_bounds(next_pos, N):
-                    continue
-                if d in [[2, 0][pos[0] % 2], [1, 3][pos[1] % 2]]:
+                nxt = cell_nbr[head * 4 + d]
+                if nxt < 0:
                     continue
-                dist_diff = distance(next_pos, apple_pos) - distance(pos, apple_pos)
-                cand_ds.append((dist_diff, (v%4+[d, -d][v//4])%4, d))
-            for _, _, d in sorted(cand_ds):
-                if can_move(pos, d):
-                    path_dirs.append(d)
-                    update_tree(pos, d)
-                    pos = moved_pos(pos, d)
-                    break
+                ahead = (index[nxt] - head_index) % cells
+                if best < ahead <= limit and to_tail - ahead > pending + 1 + (nxt == apple):
+                    best_dir, best = d, ahead
+            path.append(best_dir)
+            head = cell_nbr[head * 4 + best_dir]
+            if pending:
+                pending -= 1
             else:
-                raise
-        undo_to_initial()
-        if best_path is None or len(path_dirs) < len(best_path):
-            best_path = path_dirs
-    pos = head_pos
-    for d in best_path:
-        update_tree(pos, d)
-        pos = moved_pos(pos, d)
-    return best_path
-
-def fill_spanning_tree():
-    global tree
-    edges = [((i, j), d) for i in range(N//2) for j in range(N//2) for d in range(4) if in_bounds(moved_pos((i, j), d), N//2)]
-    uf = UnionFind((N//2) * (N//2))
-    for pos, dir in edges:
-        if tree[pos][dir] == MUST:
-            nxt = moved_pos(pos, dir)
-            uf.union(pos[0]*(N//2)+pos[1], nxt[0]*(N//2)+nxt[1])
-    for pos, dir in edges:
-        if tree[pos][dir] != FREE:
-            continue
-        nxt = moved_pos(pos, dir)
-        if uf.find(pos[0]*(N//2)+pos[1]) != uf.find(nxt[0]*(N//2)+nxt[1]):
-            set_tree_restriction(pos, dir, MUST)
-            uf.union(pos[0]*(N//2)+pos[1], nxt[0]*(N//2)+nxt[1])
-    for pos, dir in edges:
-        if tree[pos][dir] == FREE:
-            set_tree_restriction(pos, dir, FORBIDDEN)
-
-def calc_hamilton_cycle():
-    global hamilton_cycle
-    hamilton_cycle = {}
-    pos = (0, 0)
-    prev_dir = West
-    for _ in range(N * N):
-        next_dir = None
-        tree_pos = (pos[0] // 2, pos[1] // 2)
-        restrictions = tree[tree_pos]
-        nei = set()
-        if (pos[0] % 2, pos[1] % 2) == (0, 0):
-            nei.add(South if restrictions[South] == MUST else East)
-            nei.add(West if restrictions[West] == MUST else North)
-        if (pos[0] % 2, pos[1] % 2) == (0, 1):
-            nei.add(North if restrictions[North] == MUST else East)
-            nei.add(West if restrictions[West] == MUST else South)
-        if (pos[0] % 2, pos[1] % 2) == (1, 0):
-            nei.add(East if restrictions[East] == MUST else North)
-            nei.add(South if restrictions[South] == MUST else West)
-        if (pos[0] % 2, pos[1] % 2) == (1, 1):
-            nei.add(East if restrictions[East] == MUST else South)
-            nei.add(North if restrictions[North] == MUST else West)
-        next_dir, = nei - {(prev_dir+2)%4}
-        hamilton_cycle[pos] = next_dir
-        pos = moved_pos(pos, next_dir)
-        prev_dir = next_dir
-
-apple_pos = measure()
-while length < N * N:
-    if head_pos == apple_pos:
-        apple_pos = measure()
-    tree = {(i, j): [FREE if in_bounds(moved_pos((i, j), d), N//2) else FORBIDDEN for d in range(4)] for i in range(N//2) for j in range(N//2)}
-    hamilton_cycle = {}
-    apple_path = calc_shortest_path()
-    fill_spanning_tree()
-    calc_hamilton_cycle()
-    for _ in range(16 if len(apple_path) >= 120 else len(apple_path)):
-        if head_pos == apple_pos:
-            break
-        next_dir = hamilton_cycle[head_pos]
-        do_move(next_dir)
+                d = next(body_dirs, None)
+                if d is None:
+                    d = path[planned]
+                    planned += 1
+                tail = cell_nbr[tail * 4 + d]
+        return path
+
+    def advance_large(self):
+        """Large-board mode: plan one cycle, then follow it to each apple with shortcuts."""
+        if self.cycle_order is None:
+            self.plan()
+            self.freeze_cycle()
+        self.follow_frozen()
+
+    def follow_frozen(self):
+        """Move to the apple along the frozen cycle, with shortcuts while the board is under SHORTCUT_FILL full."""
+        if self.apple_pos is None or self.head_pos == self.apple_pos:
+            self.apple_pos = self.grid.cell(self.game.measure())
+        if self.length < self.grid.cells * SHORTCUT_FILL:
+            directions = self.shortcut_path()
+        else:
+            directions = self.cycle_run()
+        applied = self.game.move_many(directions)
+        self.track_moves(directions[:applied])
+
+    def run(self):
+        advance = self.advance_large if self.large_board else self.advance
+        if not hasattr(self.game, "move_many"):
+            advance = self.step
+        checkpointer = self.checkpointer
+        while not self.done:
+            advance()
+            if checkpointer is not None:
+                checkpointer.tick(self)
@@ -2,50 +2,149 @@ North = 0
 East = 1
 South = 2
 West = 3
+DIR_VECS = ((0, 1), (1, 0), (0, -1), (-1, 0))
 
-x = 0
-y = 0
-n = 32
-cnt = 0
-nx, ny = measure()
-
-def mov(d):
-    global x
-    global y
-    global nx
-    global ny
-    global cnt
-    if cnt < n * n - 1:
-        if d == North:
-            y += 1
-        elif d == East:
-            x += 1
-        elif d == South:
-            y -= 1
-        elif d == West:
-            x -= 1
-        move(d)
-        if (x, y) == (nx, ny):
-            cnt += 1
-            if cnt < n * n - 2:
-                nx, ny = measure()
-while cnt < n * n - 2:
-    for i in range(n-1):
-        mov(North)
-    mov(East)
-    for j in range(n // 2 - 1):
-        go = 0
-        if cnt >= (n - 1) * 4 + x // 2 * (n - 2) * 2 - 1 or cnt >= n * n // 2:
-            go = n-2
-        elif x <= nx < x + 2 and 0 < ny < n-1:
-            go = n-1-ny
-        for i in range(go):
-            mov(South)
-        mov(East)
-        for i in range(go):
-            mov(North)
-        mov(East)
-    for i in range(n-1):
-        mov(South)
-    for i in range(n-1):
-        mov(West)
\ No newline at end of file
+
+class Solver:
+    """
+    Zig-zag lap solver bound to one game.
+    Sweeps the board column pair by column pair, cutting each pair short when
+    the apple is not in it; call run() to play the whole game or step() per move.
+    """
+
+    def __init__(self, game):
+        self.game = game
+        self.n = game.get_world_size()
+        self.x = 0
+        self.y = 0
+        self.cnt = 0
+        self.nx = None
+        self.ny = None
+        self._laps = None
+        self._run_dir = None
+        self._run_left = 0
+        self.checkpointer = None  # checkpoint.Checkpointer ticked at the start of every lap
+
+    def get_state(self):
+        """Position and apple count, for checkpoint.py; only resumable at the start of a lap."""
+        return {"x": self.x, "y": self.y, "cnt": self.cnt, "nx": self.nx, "ny": self.ny}
+
+    @property
+    def resumable(self):
+        """Whether get_state() can be resumed from: only at the start of a lap."""
+        return (self.x, self.y) == (0, 0)
+
+    def set_state(self, state):
+        if (state["x"], state["y"]) != (0, 0):
+            raise ValueError("solver_classical can only resume from the start of a lap")
+        self.x, self.y = state["x"], state["y"]
+        self.cnt = state["cnt"]
+        self.nx, self.ny = state["nx"], state["ny"]
+
+    @property
+    def done(self):
+        return self.cnt >= self.n * self.n - 2
+
+    def mov(self, d):
+        n = self.n
+        if self.cnt < n * n - 1:
+            if d == North:
+                self.y += 1
+            elif d == East:
+                self.x += 1
+            elif d == South:
+                self.y -= 1
+            elif d == West:
+                self.x -= 1
+            self.game.move(d)
+            if (self.x, self.y) == (self.nx, self.ny):
+                self.cnt += 1
+                if self.cnt < n * n - 2:
+                    self.nx, self.ny = self.game.measure()
+
+    def emit(self, directions):
+        """Play a buffered stretch of the lap, stopping to measure each apple it eats."""
+        game = self.game
+        last = self.n * self.n - 2
+        while directions:
+            applied = game.move_many(directions)
+            if not applied:
+                return False
+            directions = directions[applied:]
+            self.x, self.y = game.get_pos_x(), game.get_pos_y()
+            if (self.x, self.y) == (self.nx, self.ny):
+                self.cnt += 1
+                if self.cnt < last:
+                    self.nx, self.ny = game.measure()
+        return True
+
+    def depth(self, x):
+        """How far down the lap dips into the column pair starting at column x."""
+        n = self.n
+        if self.cnt >= (n - 1) * 4 + x // 2 * (n - 2) * 2 - 1 or self.cnt >= n * n // 2:
+            return n - 2
+        if x <= self.nx < x + 2 and 0 < self.ny < n - 1:
+            return n - 1 - self.ny
+        return 0
+
+    def laps(self):
+        """Yield the lap as (direction, count) runs; column pair shortcuts depend on the current apple."""
+        n = self.n
+        while self.cnt < n * n - 2:
+            yield North, n - 1
+            yield East, 1
+            for j in range(n // 2 - 1):
+                go = self.depth(self.x)
+                yield South, go
+                yield East, 1
+                yield North, go
+                yield East, 1
+            yield South, n - 1
+            yield West, n - 1
+
+    def step(self):
+        """Issue the next direction of the lap; returns False once the game is over."""
+        if self._laps is None:
+            self.nx, self.ny = self.game.measure()
+            self._laps = self.laps()
+        while not self._run_left:
+            run = next(self._laps, None)
+            if run is None:
+                return False
+            self._run_dir, self._run_left = run
+        self._run_left -= 1
+        self.mov(self._run_dir)
+        return True
+
+    def run(self):
+        if not hasattr(self.game, "move_many") or self._laps is not None:
+            while self.step():
+                pass
+            return
+        n = self.n
+        # The lap's pieces as direction lists, built once: up column 0, each
+        # column pair at every depth, and back down and along row 0
+        up = [North] * (n - 1) + [East]
+        pairs = [[South] * go + [East] + [North] * go + [East] for go in range(n - 1)]
+        back = [South] * (n - 1) + [West] * (n - 1)
+        self.nx, self.ny = self.game.measure()
+        checkpointer = self.checkpointer
+        while self.cnt < n * n - 2:
+            if checkpointer is not None:
+                checkpointer.tick(self)
+            # Depths only change when an apple is eaten, so pieces are buffered
+            # and played in one call up to the piece that reaches the apple
+            pending = list(up)
+            if self.nx <= 1 and (self.nx == 0 or self.ny == n - 1):
+                if not self.emit(pending):
+                    return
+                pending = []
+            for x in range(1, n - 1, 2):
+                go = self.depth(x)
+                pending += pairs[go]
+                if x <= self.nx <= x + 2 and (self.ny >= n - 1 - go or self.ny == n - 1):
+                    if not self.emit(pending):
+                        return
+                    pending = []
+            if not self.emit(pending + back):
+                return
@@ -0,0 +1,23 @@
+"""
+Golden games from bench.py as a test: any change to a bundled solver's moves
+or outcome fails here instead of silently moving bench_baseline.json.
+Timings are not checked.
+"""
+import json
+
+import pytest
+
+import bench
+
+
+@pytest.fixture(scope="module")
+def baseline():
+    with open(bench.BASELINE_PATH) as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("solver_name,size,seed", bench.GOLDEN, ids=[bench.case_name(*case) for case in bench.GOLDEN])
+def test_golden_game(baseline, solver_name, size, seed):
+    name = bench.case_name(solver_name, size, seed)
+    current = {"games": {name: bench.play_golden(solver_name, size, seed)}}
+    assert bench.compare(current, baseline, check_timing=False, tolerance=bench.TOLERANCE) == []
@@ -0,0 +1,62 @@
+"""
+Checkpoint round trips: a game resumed from its last periodic checkpoint must
+finish with the same moves as the uninterrupted golden game in bench.py.
+"""
+import hashlib
+import importlib
+import json
+
+import pytest
+
+import bench
+import checkpoint
+import game
+
+
+def recording(g, moves):
+    """Append every move `g` applies to `moves`."""
+    move_many = g.move_many
+
+    def recorded(directions):
+        step = g.step_counter
+        try:
+            return move_many(directions)
+        finally:
+            moves.extend(directions[: g.step_counter - step])
+
+    g.move_many = recorded
+
+
+@pytest.mark.parametrize(
+    "solver_name,size,seed,every",
+    [("solver", 16, 1, 2000), ("solver", 64, 1, 500000), ("solver_classical", 32, 1, 40000)],
+)
+def test_resume_matches_golden_digest(tmp_path, solver_name, size, seed, every):
+    with open(bench.BASELINE_PATH) as f:
+        expected = json.load(f)["games"][bench.case_name(solver_name, size, seed)]
+    module = importlib.import_module(solver_name)
+    path = str(tmp_path / "checkpoint.json")
+
+    moves = []
+    g = game.Game(size, seed=seed)
+    recording(g, moves)
+    s = module.Solver(g)
+    s.checkpointer = checkpoint.Checkpointer(path, seed, solver_name, every)
+    s.run()
+    saved_step = s.checkpointer.saved_step
+    assert saved_step is not None and 0 < saved_step < g.step_counter
+
+    data = checkpoint.load(path)
+    assert data["solver"] == solver_name
+    resumed = game.Game(size, seed=seed)
+    checkpoint.restore_game(resumed, data["game"])
+    assert resumed.step_counter == saved_step
+    rest = []
+    recording(resumed, rest)
+    s = module.Solver(resumed)
+    s.set_state(data["solver_state"])
+    s.run()
+
+    assert not resumed.game_over
+    assert resumed.step_counter == expected["moves"]
+    assert hashlib.sha1(bytes(moves[:saved_step] + rest)).hexdigest() == expected["digest"]
@@ -0,0 +1,79 @@
+"""
+Replays against the live game they recorded: seek() must reproduce the
+snake, growth and apple the game had at every sampled step.
+"""
+import random
+
+import pytest
+
+import game
+import replay
+import solver
+
+
+def play_recorded(path, size, seed, interval, start=0, samples=60):
+    """
+    Play a solver game recorded from step `start` on (the position reached by
+    then, as after --resume); returns the game, the step recording started at
+    and the live states at sampled steps.
+    """
+    g = game.Game(size, seed=seed)
+    s = solver.Solver(g)
+    while g.step_counter < start:
+        s.advance()
+    writer = replay.ReplayWriter(path, size, seed, interval)
+    writer.attach(g)
+    first = g.step_counter
+    wanted = set(random.Random(seed).sample(range(first + 1, 6000), samples))
+    states = {}
+    move_many = g.move_many
+
+    def sampled(directions):
+        # Stop at every sampled step to copy the live state
+        applied = 0
+        while applied < len(directions):
+            step = g.step_counter
+            stop = min((w for w in wanted if w > step), default=step + len(directions))
+            chunk = directions[applied : applied + stop - step]
+            done = move_many(chunk)
+            applied += done
+            if g.step_counter in wanted:
+                states[g.step_counter] = (list(g.snake), g.grow_pending, None if g.apple_eaten else g.apple)
+            if done < len(chunk):
+                break
+        return applied
+
+    g.move_many = sampled
+    s.run()
+    writer.close(g)
+    return g, first, states
+
+
+@pytest.mark.parametrize("start", [0, 1234])
+def test_seek_matches_live_game(tmp_path, start):
+    path = str(tmp_path / "game.snkr")
+    g, first, states = play_recorded(path, 16, 1, 100, start)
+    reader = replay.ReplayReader(path)
+    assert reader.start_step == first
+    assert reader.final_step == g.step_counter
+    assert all(step % 100 == 0 for step in reader.keyframe_steps[1:])
+
+    # Forward, backward and far jumps all go through seek()
+    steps = sorted(states)
+    for step in steps + steps[::-1] + steps[::7]:
+        snake, grow_pending, apple = states[step]
+        replayed = reader.seek(step)
+        assert replayed.step_counter == step
+        assert list(replayed.snake) == snake
+        assert replayed.grow_pending == grow_pending
+        if apple is not None:
+            assert replayed.apple == apple
+
+    # Steps before the recording started clamp to its first position
+    assert reader.seek(0).step_counter == reader.start_step
+    assert reader.seek(reader.final_step + 10).step_counter == g.step_counter
+
+
+def test_writer_rejects_boards_past_u16_cells(tmp_path):
+    with pytest.raises(ValueError):
+        replay.ReplayWriter(str(tmp_path / "big.snkr"), replay.MAX_SIZE + 2, 0)
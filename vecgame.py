@@ -0,0 +1,253 @@
+"""
+Vectorized batch of games for large sweeps (needs NumPy).
+BatchGame holds B boards as arrays (occupancy, ring-buffer bodies, apples)
+and applies one direction per game per step() with the rules of game.Game.
+Apples are drawn by measure() from one random.Random(seed) per game exactly
+as Game draws them, so every game in the batch matches the Game with the same
+seed driven by the same moves.
+ClassicalPolicy is solver_classical's zig-zag lap computed for all games at
+once and plays the same moves:
+
+    python vecgame.py --seeds 0-9999 --size 32
+"""
+import argparse
+import json
+import random
+import sys
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from batch import parse_seeds, print_summary, summarize
+from game import North, East, South, West
+
+# Crash codes in BatchGame.error
+HIT_WALL = 1
+HIT_SELF = 2
+
+
+class BatchGame:
+    """
+    B games on size x size boards, stepped together.
+    Cells are row-major ids (y * size + x) as in Game. Each body is a ring
+    buffer of cells whose head is at body[b, head_ptr[b] % cells]. As in Game,
+    an eaten apple stays in `apple` (flagged in `apple_eaten`) until the next
+    measure(), and -1 means there is none.
+    """
+
+    def __init__(self, size, seeds):
+        if np is None:
+            raise RuntimeError("vecgame.py needs NumPy (pip install numpy)")
+        self.size = size
+        self.cells = cells = size * size
+        self.seeds = list(seeds)
+        self.rngs = [random.Random(seed) for seed in self.seeds]
+        count = len(self.seeds)
+        self.occupied = np.zeros((count, cells), np.uint8)
+        self.occupied[:, 0] = 1
+        self.body = np.zeros((count, cells), np.int32)
+        self.head_ptr = np.zeros(count, np.int64)
+        self.body_len = np.ones(count, np.int64)
+        self.grow_pending = np.zeros(count, np.int64)
+        self.x = np.zeros(count, np.int64)
+        self.y = np.zeros(count, np.int64)
+        self.apple = np.full(count, -1, np.int64)
+        self.apple_eaten = np.ones(count, bool)
+        self.step_counter = np.zeros(count, np.int64)
+        self.game_over = np.zeros(count, bool)
+        self.error = np.zeros(count, np.int8)
+        self.dx = np.array([0, 1, 0, -1], np.int64)
+        self.dy = np.array([1, 0, -1, 0], np.int64)
+
+    def __len__(self):
+        return len(self.seeds)
+
+    @property
+    def length(self):
+        return self.body_len + self.grow_pending
+
+    def measure(self, rows=None):
+        """Create a new apple, like Game.measure(), in each game of `rows` (default all) that needs one."""
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows)
+        rows = rows[self.apple_eaten[rows] | (self.apple[rows] < 0)]
+        if rows.size:
+            # Each game draws k from its own RNG, then the k-th free cell in row-major order is found for all at once
+            rngs = self.rngs
+            free_counts = (self.cells - self.body_len[rows]).tolist()
+            k = np.array([rngs[b].choice(range(c)) if c else -1 for b, c in zip(rows.tolist(), free_counts)])
+            free_seen = (self.occupied[rows] == 0).cumsum(axis=1)
+            self.apple[rows] = np.where(k >= 0, (free_seen <= k[:, None]).sum(axis=1), -1)
+            self.apple_eaten[rows] = False
+        return self.apple
+
+    def step(self, actions):
+        """
+        Move every game by its direction in `actions`; a value outside 0..3
+        (e.g. -1 for a finished game) leaves that game alone. A game that hits
+        a wall or itself is marked game_over and not moved, as Game.move does.
+        """
+        actions = np.asarray(actions)
+        rows = np.flatnonzero((actions >= 0) & (actions < 4) & ~self.game_over)
+        if not rows.size:
+            return
+        size = self.size
+        cells = self.cells
+        # Flat views so each board access is a single gather or scatter
+        occupied = self.occupied.reshape(-1)
+        body = self.body.reshape(-1)
+        base = rows * cells
+        a = actions[rows]
+        nx = self.x[rows] + self.dx[a]
+        ny = self.y[rows] + self.dy[a]
+        wall = (nx < 0) | (ny < 0) | (nx >= size) | (ny >= size)
+        cell = np.where(wall, 0, ny * size + nx)
+        ate = cell == self.apple[rows]
+        growing = self.grow_pending[rows] > 0
+        tail = body[base + (self.head_ptr[rows] - self.body_len[rows] + 1) % cells]
+        # Moving into the tail is allowed when it vacates this step
+        vacates = ~growing & ~ate & (cell == tail)
+        hit = ~wall & (occupied[base + cell] == 1) & ~vacates
+        crashed = wall | hit
+        if crashed.any():
+            self.game_over[rows[crashed]] = True
+            self.error[rows[crashed]] = np.where(wall[crashed], HIT_WALL, HIT_SELF)
+            ok = ~crashed
+            rows, base, cell, ate, growing, tail = rows[ok], base[ok], cell[ok], ate[ok], growing[ok], tail[ok]
+            nx, ny = nx[ok], ny[ok]
+        # Pending growth skips the pop; otherwise the tail leaves before the head is marked
+        if growing.any():
+            self.grow_pending[rows[growing]] -= 1
+            self.body_len[rows[growing]] += 1
+        popping = ~growing
+        occupied[base[popping] + tail[popping]] = 0
+        head_ptr = self.head_ptr[rows] + 1
+        self.head_ptr[rows] = head_ptr
+        body[base + head_ptr % cells] = cell
+        occupied[base + cell] = 1
+        self.x[rows] = nx
+        self.y[rows] = ny
+        self.step_counter[rows] += 1
+        if ate.any():
+            self.grow_pending[rows[ate]] += 1
+            self.apple_eaten[rows[ate]] = True
+
+
+class ClassicalPolicy:
+    """solver_classical's zig-zag lap as one vectorized decision per step for a whole BatchGame."""
+
+    def __init__(self, game):
+        self.game = game
+        self.go = np.zeros(len(game), np.int64)  # depth of the column pair each game is in
+        # The lap's direction from every cell at every pair depth, indexed by go * cells + cell
+        n = game.size
+        go, y, x = np.meshgrid(np.arange(n - 1), np.arange(n), np.arange(n), indexing="ij")
+        self.lap = self.lap_directions(x, y, go).astype(np.int8).reshape(-1)
+
+    def finished(self):
+        """Games that crashed, or ate their last apple and completed the lap, as Solver.run() does."""
+        game = self.game
+        n = game.size
+        return game.game_over | ((game.length - 1 >= n * n - 2) & (game.x == 0) & (game.y == 0))
+
+    def depth(self, x, cnt, apple):
+        """Solver.depth() for the games entering the column pairs starting at columns `x`."""
+        n = self.game.size
+        ax, ay = apple % n, apple // n
+        full = (cnt >= (n - 1) * 4 + x // 2 * (n - 2) * 2 - 1) | (cnt >= n * n // 2)
+        in_pair = (x <= ax) & (ax < x + 2) & (0 < ay) & (ay < n - 1)
+        return np.where(full, n - 2, np.where(in_pair, n - 1 - ay, 0))
+
+    def lap_directions(self, x, y, go):
+        """Direction of the lap from (x, y) in a column pair of depth `go`."""
+        n = self.game.size
+        return np.select(
+            [x == 0, y == 0, x == n - 1, x % 2 == 1],
+            [
+                np.where(y < n - 1, North, East),
+                West,
+                South,
+                np.where(y > n - 1 - go, South, East),
+            ],
+            # Even columns climb back to the top row
+            np.where(y < n - 1, North, East),
+        )
+
+    def actions(self):
+        """Next direction of every game, or -1 once it has finished."""
+        game = self.game
+        n = game.size
+        x, y = game.x, game.y
+        # The solver measures after every apple but the last
+        game.measure(np.flatnonzero(game.apple_eaten & (game.length - 1 < n * n - 2) & ~game.game_over))
+        # A pair's depth is fixed on entering it at the top of its first column
+        entering = np.flatnonzero((y == n - 1) & (x % 2 == 1) & (x <= n - 3))
+        if entering.size:
+            cnt = game.length[entering] - 1
+            self.go[entering] = self.depth(x[entering], cnt, game.apple[entering])
+        actions = self.lap[self.go * game.cells + y * n + x]
+        actions[self.finished()] = -1
+        return actions
+
+    def run(self):
+        step = self.game.step
+        while True:
+            actions = self.actions()
+            if (actions < 0).all():
+                return
+            step(actions)
+
+
+def play_classical(size, seeds):
+    """Play every seed with ClassicalPolicy; returns batch.py-style result dicts."""
+    start = time.perf_counter()
+    game = BatchGame(size, seeds)
+    policy = ClassicalPolicy(game)
+    policy.run()
+    wall = time.perf_counter() - start
+    success = policy.finished() & ~game.game_over
+    messages = {HIT_WALL: "Hit the wall", HIT_SELF: "Ran into itself"}
+    return [
+        {
+            "solver": "vecgame",
+            "seed": seed,
+            "size": size,
+            "success": bool(success[b]),
+            "moves": int(game.step_counter[b]),
+            "length": int(game.length[b]),
+            "apples": int(game.length[b]) - 1,
+            # The batch's wall time, shared evenly between its games
+            "wall_time": wall / len(game),
+            "error": messages.get(int(game.error[b])),
+        }
+        for b, seed in enumerate(game.seeds)
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play many seeds at once with the vectorized zig-zag policy.")
+    parser.add_argument("--seeds", default="0-999", help='seed list/ranges, e.g. "0-9999" (default 0-999)')
+    parser.add_argument("--size", type=int, default=32, help="board size (default 32)")
+    parser.add_argument("--chunk", type=int, default=10000, help="games stepped together (default 10000)")
+    parser.add_argument("--out", default=None, help="also write the results as JSON Lines")
+    args = parser.parse_args(argv)
+
+    seeds = parse_seeds(args.seeds)
+    results = []
+    for i in range(0, len(seeds), args.chunk):
+        chunk = seeds[i:i + args.chunk]
+        start = time.perf_counter()
+        results.extend(play_classical(args.size, chunk))
+        print(f"{len(results)}/{len(seeds)} games, chunk of {len(chunk)} in {time.perf_counter() - start:.1f} s")
+    if args.out:
+        with open(args.out, "w") as f:
+            for result in results:
+                f.write(json.dumps(result) + "\n")
+    print_summary("vecgame", summarize(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())